@@ -0,0 +1,33 @@
+"""tender_metadata full-text search
+
+Revision ID: 3e7b0d5c9a12
+Revises: f81c07b3a5d9
+Create Date: 2026-10-17 16:02:31.518207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e7b0d5c9a12'
+down_revision: Union[str, None] = 'f81c07b3a5d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Stored generated column, so Postgres fills it for existing rows and keeps
+    # it current on every insert and update
+    op.add_column('tender_metadata', sa.Column('searchVector', postgresql.TSVECTOR(), sa.Computed("setweight(to_tsvector('english', coalesce(title, '')), 'A') || setweight(to_tsvector('english', coalesce(description, '')), 'B') || setweight(to_tsvector('english', coalesce(memo, '') || ' ' || coalesce(\"awardMemo\", '')), 'C')", persisted=True), nullable=True))
+    op.create_index('ix_tender_metadata_search', 'tender_metadata', ['searchVector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tender_metadata_search', table_name='tender_metadata', postgresql_using='gin')
+    op.drop_column('tender_metadata', 'searchVector')
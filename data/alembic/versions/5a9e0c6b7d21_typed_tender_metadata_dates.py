@@ -0,0 +1,57 @@
+"""typed tender metadata dates
+
+Revision ID: 5a9e0c6b7d21
+Revises: e2f7a93c4d18
+Create Date: 2026-10-17 12:41:08.552190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9e0c6b7d21'
+down_revision: Union[str, None] = 'e2f7a93c4d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = {
+    'closingDate': (sa.DateTime(), 'timestamp'),
+    'issuedDate': (sa.DateTime(), 'timestamp'),
+    'publicOpeningDate': (sa.DateTime(), 'timestamp'),
+    'postDate': (sa.Date(), 'date'),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, (type_, cast) in COLUMNS.items():
+        # Values that don't start with an ISO date can't be cast and become
+        # NULL, replaying the raw archive restores anything parseable
+        op.alter_column(
+            'tender_metadata',
+            name,
+            existing_type=sa.String(),
+            type_=type_,
+            existing_nullable=True,
+            postgresql_using=(
+                f'CASE WHEN "{name}" ~ \'^\\d{{4}}-\\d{{2}}-\\d{{2}}\' '
+                f'THEN "{name}"::{cast} END'
+            ),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, (type_, _) in COLUMNS.items():
+        op.alter_column(
+            'tender_metadata',
+            name,
+            existing_type=type_,
+            type_=sa.String(),
+            existing_nullable=True,
+            postgresql_using=f'"{name}"::text',
+        )
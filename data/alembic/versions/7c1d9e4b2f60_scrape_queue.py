@@ -0,0 +1,41 @@
+"""scrape queue
+
+Revision ID: 7c1d9e4b2f60
+Revises: 02a3b10e21ea
+Create Date: 2026-10-17 09:12:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1d9e4b2f60'
+down_revision: Union[str, None] = '02a3b10e21ea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scrape_queue',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('state', sa.String(), server_default='pending', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('lastError', sa.String(), nullable=True),
+    sa.Column('nextAttemptAt', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('claimedAt', sa.DateTime(), nullable=True),
+    sa.Column('updatedAt', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_scrape_queue_state_next', 'scrape_queue', ['state', 'nextAttemptAt'], unique=False)
+    # Tenders already waiting in new_tenders become pending jobs
+    op.execute('INSERT INTO scrape_queue (id) SELECT id FROM new_tenders ON CONFLICT DO NOTHING')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scrape_queue_state_next', table_name='scrape_queue')
+    op.drop_table('scrape_queue')
@@ -0,0 +1,42 @@
+"""dwh indexes
+
+Revision ID: 9d3b6f1e8a45
+Revises: 5a9e0c6b7d21
+Create Date: 2026-10-17 13:18:52.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b6f1e8a45'
+down_revision: Union[str, None] = '5a9e0c6b7d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_new_tenders_post_date', 'new_tenders', ['postDate'], unique=False)
+    op.create_index('ix_master_tenders_post_date_id', 'master_tenders', ['postDate', 'id'], unique=False)
+    op.create_index('ix_master_tenders_closing_date', 'master_tenders', ['closingDate'], unique=False)
+    op.create_index('ix_master_tenders_procurement_entity', 'master_tenders', ['procurementEntity'], unique=False)
+    op.create_index('ix_master_tenders_tender_status', 'master_tenders', ['tenderStatus'], unique=False)
+    op.create_index('ix_tender_metadata_closing_date', 'tender_metadata', ['closingDate'], unique=False)
+    op.create_index('ix_tender_metadata_unspsc_level_data', 'tender_metadata', ['unspscLevelData'], unique=False, postgresql_using='gin', postgresql_ops={'unspscLevelData': 'jsonb_path_ops'})
+    op.create_index('ix_tender_metadata_tender_award_data', 'tender_metadata', ['tenderAwardData'], unique=False, postgresql_using='gin', postgresql_ops={'tenderAwardData': 'jsonb_path_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tender_metadata_tender_award_data', table_name='tender_metadata', postgresql_using='gin', postgresql_ops={'tenderAwardData': 'jsonb_path_ops'})
+    op.drop_index('ix_tender_metadata_unspsc_level_data', table_name='tender_metadata', postgresql_using='gin', postgresql_ops={'unspscLevelData': 'jsonb_path_ops'})
+    op.drop_index('ix_tender_metadata_closing_date', table_name='tender_metadata')
+    op.drop_index('ix_master_tenders_tender_status', table_name='master_tenders')
+    op.drop_index('ix_master_tenders_procurement_entity', table_name='master_tenders')
+    op.drop_index('ix_master_tenders_closing_date', table_name='master_tenders')
+    op.drop_index('ix_master_tenders_post_date_id', table_name='master_tenders')
+    op.drop_index('ix_new_tenders_post_date', table_name='new_tenders')
@@ -0,0 +1,34 @@
+"""listing watermarks
+
+Revision ID: b4e8a1f05c37
+Revises: 7c1d9e4b2f60
+Create Date: 2026-10-17 10:03:17.220914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8a1f05c37'
+down_revision: Union[str, None] = '7c1d9e4b2f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('listing_watermarks',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('postDate', sa.Date(), nullable=False),
+    sa.Column('tenderId', sa.Integer(), nullable=False),
+    sa.Column('updatedAt', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('listing_watermarks')
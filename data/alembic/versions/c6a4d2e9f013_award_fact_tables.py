@@ -0,0 +1,103 @@
+"""award fact tables
+
+Revision ID: c6a4d2e9f013
+Revises: 9d3b6f1e8a45
+Create Date: 2026-10-17 14:02:31.617784
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a4d2e9f013'
+down_revision: Union[str, None] = '9d3b6f1e8a45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Same flattening as ingestion.utils.refresh_award_facts, over every tender
+NUMERIC = (
+    "CASE WHEN regexp_replace({0}, '[$,\\s]', '', 'g') ~ '^-?(\\d+(\\.\\d*)?|\\.\\d+)$' "
+    "THEN regexp_replace({0}, '[$,\\s]', '', 'g')::numeric END"
+)
+ELEMENTS = (
+    "jsonb_array_elements(CASE WHEN jsonb_typeof({0}) = 'array' THEN {0} "
+    "ELSE jsonb_build_array() END) WITH ORDINALITY"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tender_awards',
+    sa.Column('masterTenderId', sa.Integer(), nullable=False),
+    sa.Column('awardIndex', sa.Integer(), nullable=False),
+    sa.Column('vendorName', sa.String(), nullable=True),
+    sa.Column('awardAmount', sa.Numeric(), nullable=True),
+    sa.Column('raw', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.ForeignKeyConstraint(['masterTenderId'], ['master_tenders.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('masterTenderId', 'awardIndex')
+    )
+    op.create_index('ix_tender_awards_vendor_name', 'tender_awards', ['vendorName'], unique=False)
+    op.create_table('tender_award_items',
+    sa.Column('masterTenderId', sa.Integer(), nullable=False),
+    sa.Column('awardIndex', sa.Integer(), nullable=False),
+    sa.Column('itemIndex', sa.Integer(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('quantity', sa.Numeric(), nullable=True),
+    sa.Column('unitPrice', sa.Numeric(), nullable=True),
+    sa.Column('amount', sa.Numeric(), nullable=True),
+    sa.Column('raw', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.ForeignKeyConstraint(['masterTenderId', 'awardIndex'], ['tender_awards.masterTenderId', 'tender_awards.awardIndex'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('masterTenderId', 'awardIndex', 'itemIndex')
+    )
+    op.create_table('tender_bids',
+    sa.Column('masterTenderId', sa.Integer(), nullable=False),
+    sa.Column('bidIndex', sa.Integer(), nullable=False),
+    sa.Column('bidderName', sa.String(), nullable=True),
+    sa.Column('bidAmount', sa.Numeric(), nullable=True),
+    sa.Column('raw', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.ForeignKeyConstraint(['masterTenderId'], ['master_tenders.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('masterTenderId', 'bidIndex')
+    )
+    op.create_index('ix_tender_bids_bidder_name', 'tender_bids', ['bidderName'], unique=False)
+
+    op.execute(f'''
+        INSERT INTO tender_awards ("masterTenderId", "awardIndex", "vendorName", "awardAmount", raw)
+        SELECT tm.id, award.ordinality, award.value ->> 'vendorName',
+               {NUMERIC.format("award.value ->> 'awardAmount'")}, award.value
+        FROM tender_metadata tm
+        JOIN master_tenders mt ON mt.id = tm.id
+        CROSS JOIN LATERAL {ELEMENTS.format('tm."tenderAwardData"')} AS award
+    ''')
+    op.execute(f'''
+        INSERT INTO tender_award_items ("masterTenderId", "awardIndex", "itemIndex", description, quantity, "unitPrice", amount, raw)
+        SELECT tm.id, award.ordinality, item.ordinality, item.value ->> 'description',
+               {NUMERIC.format("item.value ->> 'quantity'")},
+               {NUMERIC.format("item.value ->> 'unitPrice'")},
+               {NUMERIC.format("item.value ->> 'totalAmount'")},
+               item.value
+        FROM tender_metadata tm
+        JOIN master_tenders mt ON mt.id = tm.id
+        CROSS JOIN LATERAL {ELEMENTS.format('tm."tenderAwardData"')} AS award
+        CROSS JOIN LATERAL {ELEMENTS.format("award.value -> 'awardItems'")} AS item
+    ''')
+    op.execute(f'''
+        INSERT INTO tender_bids ("masterTenderId", "bidIndex", "bidderName", "bidAmount", raw)
+        SELECT tm.id, bid.ordinality, bid.value ->> 'vendorName',
+               {NUMERIC.format("bid.value ->> 'bidAmount'")}, bid.value
+        FROM tender_metadata tm
+        JOIN master_tenders mt ON mt.id = tm.id
+        CROSS JOIN LATERAL {ELEMENTS.format('tm."tenderBidInformationDataList"')} AS bid
+    ''')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tender_bids_bidder_name', table_name='tender_bids')
+    op.drop_table('tender_bids')
+    op.drop_table('tender_award_items')
+    op.drop_index('ix_tender_awards_vendor_name', table_name='tender_awards')
+    op.drop_table('tender_awards')
@@ -0,0 +1,34 @@
+"""listing fingerprints
+
+Revision ID: e2f7a93c4d18
+Revises: b4e8a1f05c37
+Create Date: 2026-10-17 11:26:40.381552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f7a93c4d18'
+down_revision: Union[str, None] = 'b4e8a1f05c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('new_tenders', sa.Column('modifiedDate', sa.DateTime(), nullable=True))
+    op.add_column('new_tenders', sa.Column('fingerprint', sa.String(), nullable=True))
+    # Left NULL for existing tenders, the next listing run adopts the current
+    # fingerprint as their baseline instead of re-scraping everything
+    op.add_column('master_tenders', sa.Column('fingerprint', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('master_tenders', 'fingerprint')
+    op.drop_column('new_tenders', 'fingerprint')
+    op.drop_column('new_tenders', 'modifiedDate')
@@ -0,0 +1,29 @@
+"""master_tenders importedAt index
+
+Revision ID: f81c07b3a5d9
+Revises: c6a4d2e9f013
+Create Date: 2026-10-17 15:10:44.208713
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f81c07b3a5d9'
+down_revision: Union[str, None] = 'c6a4d2e9f013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Lets the API read the current data version with a single index probe
+    op.create_index('ix_master_tenders_imported_at', 'master_tenders', ['importedAt'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_master_tenders_imported_at', table_name='master_tenders')
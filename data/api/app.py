@@ -0,0 +1,230 @@
+import base64
+import contextlib
+import hashlib
+import json
+import os
+from datetime import date
+from typing import Any, Awaitable, Callable, List, Tuple
+
+import asyncpg
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from api.cache import TTLCache, VersionTracker
+from ingestion.resources import DataWarehouseResource
+from ingestion.utils import prefix_tsquery
+
+load_dotenv()
+
+MAX_PAGE_SIZE = 200
+LISTING_FIELDS = [
+    "id",
+    "tenderId",
+    "title",
+    "solicitationType",
+    "procurementEntity",
+    "endUserEntity",
+    "closingDate",
+    "postDate",
+    "tenderStatus",
+]
+
+
+def listing_columns(prefix: str = "") -> str:
+    return ", ".join(f'{prefix}"{field}"' for field in LISTING_FIELDS)
+
+
+def encode_cursor(post_date: date, tender_id: int) -> str:
+    raw = f"{post_date.isoformat()}:{tender_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        post_date, tender_id = raw.split(":")
+        return date.fromisoformat(post_date), int(tender_id)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+
+
+def to_json(data: Any) -> bytes:
+    return json.dumps(data, default=str, separators=(",", ":")).encode()
+
+
+async def data_version(pool: asyncpg.Pool) -> str:
+    # importedAt is bumped on every write to master_tenders, so its maximum
+    # changes exactly when an ingestion run lands data
+    value = await pool.fetchval('SELECT max("importedAt") FROM master_tenders')
+    return value.isoformat() if value else ""
+
+
+async def list_tenders(pool: asyncpg.Pool, request: Request) -> dict:
+    params = request.query_params
+    try:
+        limit = min(max(int(params.get("limit", 50)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise HTTPException(400, "Invalid limit")
+
+    # Seek past the last (postDate, id) of the previous page so deep pages cost
+    # the same as the first one
+    clauses = ['"postDate" IS NOT NULL']
+    args: List[Any] = []
+    if "after" in params:
+        args.extend(decode_cursor(params["after"]))
+        clauses.append(f'("postDate", id) < (${len(args) - 1}, ${len(args)})')
+    for param, column in (
+        ("entity", "procurementEntity"),
+        ("status", "tenderStatus"),
+        ("solicitation_type", "solicitationType"),
+    ):
+        if param in params:
+            args.append(params[param])
+            clauses.append(f'"{column}" = ${len(args)}')
+    args.append(limit)
+
+    rows = await pool.fetch(
+        f"SELECT {listing_columns()} FROM master_tenders "
+        f"WHERE {' AND '.join(clauses)} "
+        f'ORDER BY "postDate" DESC, id DESC LIMIT ${len(args)}',
+        *args,
+    )
+    items = [dict(row) for row in rows]
+    last = items[-1] if len(items) == limit else None
+    return {
+        "items": items,
+        "next": encode_cursor(last["postDate"], last["id"]) if last else None,
+    }
+
+
+async def get_tender(pool: asyncpg.Pool, request: Request) -> dict:
+    try:
+        tender_id = int(request.path_params["tender_id"])
+    except ValueError:
+        raise HTTPException(404, "Tender not found")
+
+    row = await pool.fetchrow(
+        f"SELECT {listing_columns('mt.')}, to_jsonb(tm) - 'id' - 'searchVector' AS metadata "
+        "FROM master_tenders mt LEFT JOIN tender_metadata tm ON tm.id = mt.id "
+        "WHERE mt.id = $1",
+        tender_id,
+    )
+    if row is None:
+        raise HTTPException(404, "Tender not found")
+
+    awards = await pool.fetch(
+        'SELECT "awardIndex", "vendorName", "awardAmount" FROM tender_awards '
+        'WHERE "masterTenderId" = $1 ORDER BY "awardIndex"',
+        tender_id,
+    )
+    return {**dict(row), "awards": [dict(a) for a in awards]}
+
+
+async def search_tenders(pool: asyncpg.Pool, request: Request) -> dict:
+    params = request.query_params
+    try:
+        limit = min(max(int(params.get("limit", 50)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise HTTPException(400, "Invalid limit")
+    terms = prefix_tsquery(params.get("q", ""))
+    if terms is None:
+        raise HTTPException(400, "Missing search terms")
+
+    rows = await pool.fetch(
+        f'SELECT {listing_columns("mt.")}, ts_rank_cd(tm."searchVector", q) AS rank '
+        "FROM tender_metadata tm "
+        "JOIN master_tenders mt ON mt.id = tm.id, "
+        "to_tsquery('english', $1) q "
+        'WHERE tm."searchVector" @@ q '
+        'ORDER BY rank DESC, mt."postDate" DESC NULLS LAST LIMIT $2',
+        terms,
+        limit,
+    )
+    return {"items": [dict(row) for row in rows]}
+
+
+def create_app(
+    dwh: DataWarehouseResource,
+    cache_size: int = 1024,
+    cache_ttl: float = 300.0,
+    version_ttl: float = 5.0,
+    max_age: int = 60,
+) -> Starlette:
+    cache: TTLCache[bytes] = TTLCache(cache_size, cache_ttl)
+    state = {}
+
+    def cached(
+        build: Callable[[asyncpg.Pool, Request], Awaitable[dict]],
+    ) -> Callable[[Request], Awaitable[Response]]:
+        # Responses are cached per URL and tagged with the data version. Clients
+        # revalidating with a current ETag get a 304 without any query being run
+        async def endpoint(request: Request) -> Response:
+            key = f"{request.url.path}?{request.url.query}"
+            version = await state["versions"].current()
+            etag = '"{}"'.format(hashlib.sha1(f"{version}|{key}".encode()).hexdigest())
+            headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+
+            if etag in request.headers.get("if-none-match", ""):
+                return Response(status_code=304, headers=headers)
+
+            body = cache.get(key, version)
+            if body is None:
+                body = to_json(await build(state["pool"], request))
+                cache.put(key, version, body)
+            return Response(body, media_type="application/json", headers=headers)
+
+        return endpoint
+
+    async def health(request: Request) -> Response:
+        return JSONResponse(
+            {"status": "ok", "cache_hits": cache.hits, "cache_misses": cache.misses}
+        )
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        pool = await dwh.create_pool(min_size=1, max_size=10)
+        state["pool"] = pool
+        state["versions"] = VersionTracker(lambda: data_version(pool), version_ttl)
+        try:
+            yield
+        finally:
+            await pool.close()
+
+    return Starlette(
+        routes=[
+            Route("/health", health),
+            Route("/tenders", cached(list_tenders)),
+            Route("/tenders/search", cached(search_tenders)),
+            Route("/tenders/{tender_id}", cached(get_tender)),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def app_from_env() -> Starlette:
+    return create_app(
+        DataWarehouseResource(
+            username=os.environ["DWH_POSTGRES_USER"],
+            password=os.environ["DWH_POSTGRES_PASSWORD"],
+            db=os.environ["DWH_POSTGRES_DB"],
+            host=os.getenv("DWH_POSTGRES_HOST", "localhost"),
+            port=int(os.getenv("DWH_POSTGRES_PORT", "5432")),
+        ),
+        cache_size=int(os.getenv("API_CACHE_SIZE", "1024")),
+        cache_ttl=float(os.getenv("API_CACHE_TTL", "300")),
+        version_ttl=float(os.getenv("API_VERSION_TTL", "5")),
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        app_from_env(),
+        host=os.getenv("API_HOST", "127.0.0.1"),
+        port=int(os.getenv("API_PORT", "8000")),
+    )
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class TTLCache(Generic[T]):
+    # In-process LRU with a per-entry time to live. Each entry is stamped with
+    # the data version it was built from, so a new ingestion invalidates
+    # everything without an explicit purge.
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, T]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: str) -> Optional[T]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic() or entry[1] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key: Hashable, version: str, value: T):
+        self._entries[key] = (time.monotonic() + self.ttl, version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class VersionTracker:
+    # Caches the current data version for `ttl` seconds, so however many
+    # requests arrive the database is asked at most once per interval
+    def __init__(self, fetch: Callable[[], Awaitable[str]], ttl: float):
+        self._fetch = fetch
+        self.ttl = ttl
+        self._version: Optional[str] = None
+        self._expires = 0.0
+        self._lock = asyncio.Lock()
+
+    async def current(self) -> str:
+        if self._version is not None and self._expires > time.monotonic():
+            return self._version
+        async with self._lock:
+            # Another request may have refreshed it while this one waited
+            if self._version is None or self._expires <= time.monotonic():
+                self._version = await self._fetch()
+                self._expires = time.monotonic() + self.ttl
+        return self._version
@@ -1,50 +1,125 @@
 import os
 import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
 from dagster_pipes import open_dagster_pipes
-from playwright.sync_api import Response, sync_playwright
+from playwright.sync_api import (
+    Browser,
+    Playwright,
+    Response,
+    Route,
+    TimeoutError as PlaywrightTimeoutError,
+    sync_playwright,
+)
 from fake_useragent import UserAgent
 
-TARGET_URL = "https://procurement-portal.novascotia.ca/tenders"
-WATCH_REQUEST = "https://procurement-portal.novascotia.ca/procurementui/authenticate"
+# Overridable so the scraper can be pointed at a local stand-in portal
+TARGET_URL = os.getenv(
+    "AUTH_TARGET_URL", "https://procurement-portal.novascotia.ca/tenders"
+)
+WATCH_REQUEST = os.getenv(
+    "AUTH_WATCH_REQUEST",
+    "https://procurement-portal.novascotia.ca/procurementui/authenticate",
+)
 
 
-def launch_browser_and_get_auth(proxy_conf):
+# Resource types the token capture never needs
+BLOCKED_RESOURCE_TYPES = {"image", "font", "stylesheet", "media"}
+LEAN = os.getenv("AUTH_CAPTURE_MODE", "lean") == "lean"
+DEADLINE_MS = int(os.getenv("AUTH_DEADLINE_MS", "15000"))
+
+
+def launch_browser(p: Playwright) -> Browser:
+    return p.chromium.launch(headless=True, args=["--no-sandbox"])
+
+
+def block_non_essential(route: Route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+def read_token(response: Response):
+    try:
+        data = response.json()
+    except Exception:
+        data = json.loads(response.text())
+    return data.get("jwttoken")
+
+
+def get_auth_from_browser(
+    browser: Browser,
+    proxy_conf,
+    lean: bool = LEAN,
+    deadline_ms: int = DEADLINE_MS,
+    timings: Optional[Dict[str, float]] = None,
+):
     jwt_token = None
     ua = UserAgent(platforms="desktop").random
+    timings = {} if timings is None else timings
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True, args=["--no-sandbox"])
-        context = browser.new_context(
-            proxy={
-                "server": f"http://{proxy_conf['server']}",
-                "username": proxy_conf["username"],
-                "password": proxy_conf["password"],
-            },
-            user_agent=ua,
-            viewport={"width": 1280, "height": 800},
-        )
+    context_options = {
+        "user_agent": ua,
+        "viewport": {"width": 1280, "height": 800},
+    }
+    if proxy_conf:
+        context_options["proxy"] = {
+            "server": f"http://{proxy_conf['server']}",
+            "username": proxy_conf["username"],
+            "password": proxy_conf["password"],
+        }
+
+    # A fresh context per token keeps cookies and storage from leaking between
+    # sessions when the browser itself is reused
+    context = browser.new_context(**context_options)
+    try:
         context.add_init_script("""
         Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
         Object.defineProperty(navigator, 'languages', { get: () => ['en-US', 'en'] });
         Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3] });
         """)
 
-        def on_response(response: Response):
-            nonlocal jwt_token
-            if response.url == WATCH_REQUEST:
-                try:
-                    data = response.json()
-                except Exception:
-                    data = json.loads(response.text())
-                jwt_token = data.get("jwttoken")
+        page = context.new_page()
+        start = time.perf_counter()
 
-        context.on("response", on_response)
+        if lean:
+            # Resolve as soon as the authenticate response lands instead of
+            # waiting out a fixed delay, and skip assets the token doesn't need
+            context.route("**/*", block_non_essential)
+            try:
+                with page.expect_response(
+                    lambda r: r.url == WATCH_REQUEST, timeout=deadline_ms
+                ) as response_info:
+                    page.goto(TARGET_URL, timeout=deadline_ms, wait_until="commit")
+                    timings["navigate"] = time.perf_counter() - start
+                jwt_token = read_token(response_info.value)
+            except PlaywrightTimeoutError:
+                jwt_token = None
+        else:
 
-        page = context.new_page()
-        page.goto(TARGET_URL, timeout=60000, wait_until="domcontentloaded")
-        page.wait_for_timeout(3000)
+            def on_response(response: Response):
+                nonlocal jwt_token
+                if response.url == WATCH_REQUEST:
+                    jwt_token = read_token(response)
+
+            context.on("response", on_response)
+            page.goto(TARGET_URL, timeout=60000, wait_until="domcontentloaded")
+            timings["navigate"] = time.perf_counter() - start
+            page.wait_for_timeout(3000)
+
+        timings["token"] = time.perf_counter() - start - timings.get("navigate", 0.0)
+
+        start = time.perf_counter()
         cookies = context.cookies()
-        browser.close()
+        timings["cookies"] = time.perf_counter() - start
+    finally:
+        context.close()
 
     if not jwt_token:
         raise Exception("No token received")
@@ -53,11 +128,106 @@ def launch_browser_and_get_auth(proxy_conf):
         "jwt": jwt_token,
         "cookies": cookies,
         "user_agent": ua,
+        "timings": timings,
     }
 
 
+def launch_browser_and_get_auth(proxy_conf):
+    start = time.perf_counter()
+    with sync_playwright() as p:
+        browser = launch_browser(p)
+        timings = {"launch": time.perf_counter() - start}
+        try:
+            return get_auth_from_browser(browser, proxy_conf, timings=timings)
+        finally:
+            browser.close()
+
+
+class BrowserWorker(threading.Thread):
+    # Playwright's sync API is bound to the thread that started it, so each
+    # worker owns one warm browser and takes jobs from the shared queue
+    def __init__(self, jobs: queue.Queue):
+        super().__init__(daemon=True)
+        self._jobs = jobs
+
+    def run(self):
+        with sync_playwright() as p:
+            browser = launch_browser(p)
+            while True:
+                proxy_conf, options, future = self._jobs.get()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                timings = {"launch": 0.0}
+                if not browser.is_connected():
+                    start = time.perf_counter()
+                    browser = launch_browser(p)
+                    timings["launch"] = time.perf_counter() - start
+                try:
+                    future.set_result(
+                        get_auth_from_browser(
+                            browser, proxy_conf, timings=timings, **options
+                        )
+                    )
+                except Exception as e:
+                    future.set_exception(e)
+
+
+def serve(host: str, port: int, pool_size: int, timeout: float):
+    jobs: queue.Queue = queue.Queue()
+    for _ in range(pool_size):
+        BrowserWorker(jobs).start()
+
+    class AuthHandler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok", "queued": jobs.qsize()})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/token":
+                self._reply(404, {"error": "not found"})
+                return
+
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            future: Future = Future()
+            options = {k: body[k] for k in ("lean", "deadline_ms") if k in body}
+            jobs.put((body.get("proxy_conf"), options, future))
+            try:
+                self._reply(200, future.result(timeout=timeout))
+            except Exception as e:
+                future.cancel()
+                self._reply(502, {"error": f"{type(e).__name__}: {e}"})
+
+    server = ThreadingHTTPServer((host, port), AuthHandler)
+    print(f"Auth service listening on {host}:{port} with {pool_size} browser(s)")
+    server.serve_forever()
+
+
 if __name__ == "__main__":
-    with open_dagster_pipes() as context:
-        proxy_conf = json.loads(os.environ["PROXY_CONF"])
-        result = launch_browser_and_get_auth(proxy_conf)
-        context.report_custom_message(result)
+    if "serve" in sys.argv[1:]:
+        serve(
+            host=os.getenv("AUTH_SERVICE_HOST", "0.0.0.0"),
+            port=int(os.getenv("AUTH_SERVICE_PORT", "8080")),
+            pool_size=int(os.getenv("AUTH_SERVICE_POOL_SIZE", "2")),
+            timeout=float(os.getenv("AUTH_SERVICE_TIMEOUT", "120")),
+        )
+    else:
+        with open_dagster_pipes() as context:
+            proxy_conf = json.loads(os.environ["PROXY_CONF"])
+            result = launch_browser_and_get_auth(proxy_conf)
+            context.log.info(
+                "Auth phase timings: "
+                + ", ".join(f"{k}={v:.2f}s" for k, v in result["timings"].items())
+            )
+            context.report_custom_message(result)
@@ -0,0 +1,336 @@
+"""Local stand-in for the procurement portal.
+
+Serves the endpoints the ingestion assets and the auth scraper talk to, backed
+by synthetic tenders shaped like the portal's `tenderDataList`:
+
+- POST /procurementui/authenticate  JWT for the browser flow (auth_scraper)
+- GET  /tenders                     page that calls authenticate, like the portal
+- POST /procurementui/tenders       listing (?page=&numberOfRecords=) or
+                                    detail (?tenderId=)
+- POST /token                       auth service stand-in, returns AuthData
+- GET  /stats                       request counts and latency percentiles
+
+Detail requests get `--latency` seconds of lognormal-jittered delay and fail
+with 500s and 429s at `--error-rate` and `--throttle-rate`. Listing and auth
+requests are never faulted, so every run sees the full backlog.
+
+    uv run python benchmarks/mock_portal.py --tenders 5000 --latency 0.2
+    PORTAL_URL=http://127.0.0.1:8100 AUTH_SERVICE_URL=http://127.0.0.1:8100 ...
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse, Response
+from starlette.routing import Route
+
+# Synthetic ids start here so benchmark rows never collide with real tenders
+ID_OFFSET = 900_000_000
+
+ENTITIES = [
+    "Department of Public Works",
+    "Nova Scotia Health",
+    "Department of Education and Early Childhood Development",
+    "Halifax Regional Municipality",
+    "Department of Natural Resources and Renewables",
+    "Nova Scotia Power",
+    "Department of Justice",
+    "Cape Breton Regional Municipality",
+]
+SOLICITATION_TYPES = ["RFP", "RFQ", "RFSO", "ITT", "RFI"]
+UNSPSC = [
+    ("72141000", "Highway and road construction services"),
+    ("43211500", "Computers"),
+    ("81111500", "Software or hardware engineering"),
+    ("42131600", "Medical staff apparel and related items"),
+    ("78181500", "Vehicle maintenance and repair services"),
+    ("80101500", "Business and corporate management consultation services"),
+]
+VENDORS = [
+    "Atlantic Paving Ltd.",
+    "Bluenose Systems Inc.",
+    "Maritime Medical Supply",
+    "Harbour Consulting Group",
+    "Fundy Fleet Services",
+    "Northumberland Builders",
+]
+WORDS = (
+    "supply delivery installation maintenance repair renovation consulting "
+    "services equipment software network road bridge school hospital "
+    "cleaning snow removal paving electrical mechanical roofing security"
+).split()
+
+LANDING_PAGE = """<!doctype html>
+<html><body><script>
+fetch("/procurementui/authenticate", {method: "POST"});
+</script></body></html>"""
+
+
+def fake_jwt(ttl: int) -> str:
+    def encode(part: dict) -> str:
+        raw = json.dumps(part).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    claims = {"sub": "mock", "exp": int(time.time()) + ttl}
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(claims)}.mock"
+
+
+def amount(rng: random.Random, low: int, high: int) -> str:
+    # The portal sends amounts as formatted strings
+    return f"${rng.uniform(low, high):,.2f}"
+
+
+def listing_tender(id: int, post_date: date) -> dict:
+    rng = random.Random(id)
+    posted = datetime.combine(post_date, datetime.min.time()) + timedelta(
+        minutes=rng.randrange(8 * 60, 17 * 60)
+    )
+    return {
+        "id": id,
+        "tenderId": f"MOCK-{id - ID_OFFSET:07d}",
+        "title": " ".join(rng.choices(WORDS, k=rng.randint(3, 8))).capitalize(),
+        "solicitationType": rng.choice(SOLICITATION_TYPES),
+        "procurementEntity": rng.choice(ENTITIES),
+        "endUserEntity": rng.choice(ENTITIES),
+        "closingDate": (posted + timedelta(days=rng.randint(14, 45))).isoformat(),
+        "postDate": posted.isoformat(),
+        "tenderStatus": "AWARDED",
+        "modifiedDate": (posted + timedelta(days=rng.randint(45, 90))).isoformat(),
+    }
+
+
+def detail_tender(listing: dict) -> dict:
+    rng = random.Random(-listing["id"])
+    code, description = rng.choice(UNSPSC)
+    awards = [
+        {
+            "vendorName": rng.choice(VENDORS),
+            "awardAmount": amount(rng, 5_000, 2_000_000),
+            "awardItems": [
+                {
+                    "description": " ".join(rng.choices(WORDS, k=4)),
+                    "quantity": str(rng.randint(1, 50)),
+                    "unitPrice": amount(rng, 10, 10_000),
+                    "totalAmount": amount(rng, 100, 500_000),
+                }
+                for _ in range(rng.randint(0, 3))
+            ],
+        }
+        for _ in range(rng.randint(1, 2))
+    ]
+    return {
+        **listing,
+        "procurementMethod": "Open",
+        "createdBy": "mock",
+        "modifiedBy": "mock",
+        "createdDate": listing["postDate"],
+        "contactName": "Procurement Officer",
+        "contactEmail": "procurement@example.org",
+        "contactProvince": "NS",
+        "tenderUrl": f"https://example.org/tenders/{listing['tenderId']}",
+        "closingTime": "14:00",
+        "description": " ".join(rng.choices(WORDS, k=rng.randint(40, 200))),
+        "memo": " ".join(rng.choices(WORDS, k=rng.randint(0, 40))),
+        "awardMemo": " ".join(rng.choices(WORDS, k=rng.randint(0, 20))),
+        "issuedDate": listing["postDate"],
+        "expectedDurationOfContract": rng.randint(1, 60),
+        "submissionLanguage": "English",
+        "tradeAgreement": [{"name": "CFTA"}, {"name": "ACP"}],
+        "attachments": [
+            {"fileName": f"{listing['tenderId']}-{n}.pdf", "size": rng.randint(1, 9)}
+            for n in range(rng.randint(0, 4))
+        ],
+        "tenderAwardData": awards,
+        "tenderBidInformationDataList": [
+            {"vendorName": rng.choice(VENDORS), "bidAmount": amount(rng, 5_000, 2e6)}
+            for _ in range(rng.randint(1, 6))
+        ],
+        "unspscLevelData": [{"unspscCode": code, "unspscDescription": description}],
+    }
+
+
+class MockPortal:
+    def __init__(
+        self,
+        tenders: int,
+        start: date,
+        end: date,
+        latency: float = 0.1,
+        jitter: float = 0.5,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        token_ttl: int = 3600,
+        seed: int = 0,
+    ):
+        # Tenders are spread evenly over [start, end) and listed newest first,
+        # like the real portal's POSTED_DATE_DESC ordering
+        days = max((end - start).days, 1)
+        self.tenders: List[dict] = sorted(
+            (
+                listing_tender(
+                    ID_OFFSET + n, start + timedelta(days=n * days // tenders)
+                )
+                for n in range(tenders)
+            ),
+            key=lambda t: (t["postDate"], t["id"]),
+            reverse=True,
+        )
+        self._by_tender_id: Dict[str, dict] = {t["tenderId"]: t for t in self.tenders}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.token_ttl = token_ttl
+        self._rng = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+
+    def _record(self, kind: str, status: int, started: float):
+        self.statuses[kind][status] += 1
+        self.latencies[kind].append(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        summary = {}
+        for kind, samples in self.latencies.items():
+            ordered = sorted(samples)
+            summary[kind] = {
+                "requests": len(ordered),
+                "statuses": dict(self.statuses[kind]),
+                "p50": percentile(ordered, 0.50),
+                "p99": percentile(ordered, 0.99),
+            }
+        return summary
+
+    async def _delay(self):
+        if self.latency > 0:
+            await asyncio.sleep(self.latency * self._rng.lognormvariate(0, self.jitter))
+
+    async def authenticate(self, request: Request) -> Response:
+        return JSONResponse({"jwttoken": fake_jwt(self.token_ttl)})
+
+    async def landing(self, request: Request) -> Response:
+        return HTMLResponse(LANDING_PAGE)
+
+    async def token(self, request: Request) -> Response:
+        return JSONResponse(
+            {
+                "jwt": fake_jwt(self.token_ttl),
+                "cookies": [
+                    {
+                        "name": "SESSION",
+                        "value": str(self._rng.getrandbits(64)),
+                        "domain": request.url.hostname,
+                    }
+                ],
+                "user_agent": "mock-portal",
+                "timings": {},
+            }
+        )
+
+    async def tenders_endpoint(self, request: Request) -> Response:
+        started = time.perf_counter()
+        params = request.query_params
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+
+        if "tenderId" in params:
+            status, body = await self._detail(params["tenderId"])
+            self._record("detail", status, started)
+            return JSONResponse(body, status_code=status)
+
+        page = int(params.get("page", 1))
+        size = int(params.get("numberOfRecords", 50))
+        rows = self.tenders[(page - 1) * size : page * size]
+        self._record("listing", 200, started)
+        return JSONResponse({"tenderDataList": rows, "totalRecords": len(self.tenders)})
+
+    async def _detail(self, tender_id: str) -> tuple:
+        await self._delay()
+        roll = self._rng.random()
+        if roll < self.throttle_rate:
+            return 429, {"error": "too many requests"}
+        if roll < self.throttle_rate + self.error_rate:
+            return 500, {"error": "internal server error"}
+        listing = self._by_tender_id.get(tender_id)
+        if listing is None:
+            return 404, {"error": "not found"}
+        return 200, {"tenderDataList": [detail_tender(listing)]}
+
+    async def stats_endpoint(self, request: Request) -> Response:
+        return JSONResponse(self.stats())
+
+    def app(self) -> Starlette:
+        return Starlette(
+            routes=[
+                Route("/tenders", self.landing),
+                Route(
+                    "/procurementui/authenticate",
+                    self.authenticate,
+                    methods=["GET", "POST"],
+                ),
+                Route(
+                    "/procurementui/tenders", self.tenders_endpoint, methods=["POST"]
+                ),
+                Route("/token", self.token, methods=["POST"]),
+                Route("/stats", self.stats_endpoint),
+            ]
+        )
+
+
+def percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def add_portal_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--tenders", type=int, default=2000)
+    parser.add_argument(
+        "--latency", type=float, default=0.1, help="median detail latency (s)"
+    )
+    parser.add_argument("--jitter", type=float, default=0.5, help="lognormal sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_portal_arguments(parser)
+    parser.add_argument(
+        "--days", type=int, default=30, help="spread tenders over the last N days"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    today = date.today()
+    portal = MockPortal(
+        args.tenders,
+        today - timedelta(days=args.days),
+        today,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(portal.app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Measure new_tenders and tender_metadata throughput against the mock portal.
+
+Starts benchmarks/mock_portal.py in-process and seeds it with synthetic tenders
+posted in one month. It then materializes both assets for that month's
+partition against the DWH in .env. Rows from earlier runs are cleared first,
+so every run scrapes the full backlog. Proxies are disabled and the mock also
+serves the auth service's /token endpoint.
+
+    uv run python -m benchmarks.portal_throughput --tenders 5000 --latency 0.2
+
+Request latency is reported twice: at the mock, from arrival to response, and
+by the asset's own per-phase histograms.
+"""
+
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+from datetime import date, timedelta
+
+from dotenv import load_dotenv
+
+from benchmarks.mock_portal import ID_OFFSET, MockPortal, add_portal_arguments
+
+load_dotenv()
+
+# Benchmark rows are the ones with synthetic ids, children before parents
+CLEANUP = [
+    ("tender_award_items", "masterTenderId"),
+    ("tender_awards", "masterTenderId"),
+    ("tender_bids", "masterTenderId"),
+    ("tender_metadata", "id"),
+    ("master_tenders", "id"),
+    ("scrape_queue", "id"),
+    ("new_tenders", "id"),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(portal: MockPortal, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(portal.app(), host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+def metadata_values(result, asset: str) -> dict:
+    (materialization,) = result.asset_materializations_for_node(asset)
+    return {k: v.value for k, v in materialization.metadata.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_portal_arguments(parser)
+    parser.add_argument(
+        "--config",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="tender_metadata run config override, e.g. concurrency_ceiling=80",
+    )
+    args = parser.parse_args()
+
+    # A whole month in the past, so the listing seek runs like in a backfill
+    end = date.today().replace(day=1)
+    start = (end - timedelta(days=1)).replace(day=1)
+    portal = MockPortal(
+        args.tenders,
+        start,
+        end,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+    port = free_port()
+    serve(portal, port)
+
+    # ingestion.utils reads PORTAL_URL at import
+    os.environ["PORTAL_URL"] = f"http://127.0.0.1:{port}"
+    import dagster as dg
+    from dagster_docker import PipesDockerClient
+    from sqlalchemy import text
+
+    from ingestion.definitions import new_tenders, tender_metadata
+    from ingestion.resources import (
+        ArchiveResource,
+        AuthServiceResource,
+        DataWarehouseResource,
+        ProxyResource,
+    )
+
+    dwh = DataWarehouseResource(
+        username=os.environ["DWH_POSTGRES_USER"],
+        password=os.environ["DWH_POSTGRES_PASSWORD"],
+        db=os.environ["DWH_POSTGRES_DB"],
+        host=os.getenv("DWH_POSTGRES_HOST", "localhost"),
+        port=int(os.getenv("DWH_POSTGRES_PORT", "5432")),
+    )
+    resources = {
+        "dwh": dwh,
+        "proxy": ProxyResource(username="", password="", enabled=False),
+        "docker_pipes_client": PipesDockerClient(),
+        "auth_service": AuthServiceResource(url=os.environ["PORTAL_URL"]),
+        "archive": ArchiveResource(),
+    }
+
+    with dwh.get_session()() as session:
+        for table, key in CLEANUP:
+            session.execute(text(f'DELETE FROM {table} WHERE "{key}" >= {ID_OFFSET}'))
+        session.execute(
+            text("DELETE FROM listing_watermarks WHERE name = :name"),
+            {"name": f"listing:{start.isoformat()}"},
+        )
+        session.commit()
+
+    overrides = {}
+    for item in args.config:
+        key, value = item.split("=", 1)
+        # Numbers and booleans as JSON, anything else as a string
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+
+    partition = start.isoformat()
+    print(f"{args.tenders} tenders in partition {partition}, mock on port {port}")
+
+    for asset, config in (
+        (new_tenders, {"max_records": args.tenders, "incremental": False}),
+        (tender_metadata, overrides),
+    ):
+        portal.reset()
+        started = time.perf_counter()
+        result = dg.materialize(
+            [asset],
+            partition_key=partition,
+            resources=resources,
+            run_config={"ops": {asset.key.path[-1]: {"config": config}}},
+        )
+        seconds = time.perf_counter() - started
+        meta = metadata_values(result, asset.key.path[-1])
+
+        print(f"\n== {asset.key.path[-1]} ({seconds:.1f}s)")
+        if asset is new_tenders:
+            records = meta["records_fetched"]
+            print(f"  records/sec      {records / seconds:>10.1f}")
+            print(f"  COPY rows/sec    {meta['rows_per_sec']:>10.1f}")
+        else:
+            print(f"  tenders/sec      {meta['scraped'] / seconds:>10.1f}")
+            print(f"  scraped          {meta['scraped']:>10}")
+            print(f"  DB rows/sec      {meta['rows_per_sec']:>10.1f}")
+            print(f"  concurrency max  {meta['concurrency_max']:>10}")
+            for phase in ("http", "slot_wait", "auth_wait", "db_commit"):
+                if f"{phase}_p50" in meta:
+                    print(
+                        f"  {phase:<16} p50 {meta[f'{phase}_p50'] * 1000:>8.1f} ms  "
+                        f"p99 {meta[f'{phase}_p99'] * 1000:>8.1f} ms"
+                    )
+        for kind, stats in portal.stats().items():
+            if stats["p50"] is None:
+                continue
+            print(
+                f"  {kind:<8} p50 {stats['p50'] * 1000:>8.1f} ms  "
+                f"p99 {stats['p99'] * 1000:>8.1f} ms  {stats['statuses']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Compare query plans for common dashboard filters with and without indexes.
+
+Each query is run twice under EXPLAIN (ANALYZE, BUFFERS): once with index
+scans disabled, which is what the tables looked like before migration
+9d3b6f1e8a45, and once with the planner's defaults.
+
+    uv run python benchmarks/query_plans.py [--verbose]
+"""
+
+import argparse
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+
+load_dotenv()
+
+SEQSCAN_ONLY = [
+    "SET LOCAL enable_indexscan = off",
+    "SET LOCAL enable_indexonlyscan = off",
+    "SET LOCAL enable_bitmapscan = off",
+]
+
+
+def database_url() -> str:
+    user = os.getenv("DWH_POSTGRES_USER")
+    password = os.getenv("DWH_POSTGRES_PASSWORD")
+    host = os.getenv("DWH_POSTGRES_HOST", "localhost")
+    port = os.getenv("DWH_POSTGRES_PORT", "5432")
+    db = os.getenv("DWH_POSTGRES_DB")
+    return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{db}"
+
+
+def json_probe(conn: Connection, column: str) -> Optional[str]:
+    # Builds a containment probe from a real value so the benchmark doesn't
+    # depend on the exact shape of the portal's JSON
+    value = conn.execute(
+        text(
+            f'SELECT "{column}" FROM tender_metadata '
+            f'WHERE "{column}" IS NOT NULL LIMIT 1'
+        )
+    ).scalar()
+    if isinstance(value, list) and value:
+        value = [value[0]]
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        value = [{k: v for k, v in value[0].items() if not isinstance(v, (dict, list))}]
+    elif isinstance(value, dict):
+        value = {k: v for k, v in value.items() if not isinstance(v, (dict, list))}
+    return json.dumps(value) if value else None
+
+
+def queries(conn: Connection) -> List[Tuple[str, str, Dict[str, Any]]]:
+    entity = conn.execute(
+        text(
+            'SELECT "procurementEntity" FROM master_tenders '
+            "GROUP BY 1 ORDER BY count(*) DESC LIMIT 1"
+        )
+    ).scalar()
+
+    found = [
+        (
+            "recent tenders, keyset page",
+            'SELECT id, "tenderId", title FROM master_tenders '
+            'WHERE ("postDate", id) < (current_date, 2147483647) '
+            'ORDER BY "postDate" DESC, id DESC LIMIT 50',
+            {},
+        ),
+        (
+            "closing in the next 30 days",
+            "SELECT id, title FROM master_tenders "
+            "WHERE \"closingDate\" BETWEEN now() AND now() + interval '30 days'",
+            {},
+        ),
+        (
+            "awarded tenders by entity",
+            "SELECT count(*) FROM master_tenders "
+            'WHERE "procurementEntity" = :entity AND "tenderStatus" = \'AWARDED\'',
+            {"entity": entity},
+        ),
+    ]
+    for column in ("unspscLevelData", "tenderAwardData"):
+        probe = json_probe(conn, column)
+        if probe is not None:
+            found.append(
+                (
+                    f"{column} containment",
+                    f"SELECT count(*) FROM tender_metadata "
+                    f'WHERE "{column}" @> CAST(:probe AS jsonb)',
+                    {"probe": probe},
+                )
+            )
+    return found
+
+
+def explain(
+    conn: Connection, sql: str, params: Dict[str, Any], seqscan_only: bool
+) -> dict:
+    with conn.begin():
+        if seqscan_only:
+            for setting in SEQSCAN_ONLY:
+                conn.execute(text(setting))
+        (plan,) = conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params
+        ).scalar()
+    return plan
+
+
+def scan_nodes(node: dict) -> List[str]:
+    found = []
+    if "Scan" in node["Node Type"]:
+        found.append(f"{node['Node Type']} on {node.get('Relation Name', '?')}")
+    for child in node.get("Plans", []):
+        found.extend(scan_nodes(child))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--verbose", action="store_true", help="print full plans")
+    args = parser.parse_args()
+
+    engine = create_engine(database_url())
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE master_tenders"))
+        conn.execute(text("ANALYZE tender_metadata"))
+        found = queries(conn)
+        conn.commit()
+
+        for name, sql, params in found:
+            print(f"\n== {name}")
+            for label, seqscan_only in (("before", True), ("after", False)):
+                plan = explain(conn, sql, params, seqscan_only)
+                print(
+                    f"  {label:<6} {plan['Execution Time']:>9.2f} ms  "
+                    + ", ".join(scan_nodes(plan["Plan"]))
+                )
+                if args.verbose:
+                    print(json.dumps(plan["Plan"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Literal, Optional, Tuple, TypedDict
+
+import zstandard
+
+ArchiveKind = Literal["listing", "tender"]
+
+
+class ArchiveEntry(TypedDict):
+    kind: ArchiveKind
+    key: str
+    fetchedAt: str
+    sha256: str
+
+
+class RawArchive:
+    # Raw portal responses are stored once per distinct body under
+    # objects/<sha256[:2]>/<sha256>.zst. An append-only index per kind and day
+    # (index/<kind>/<YYYY-MM-DD>.jsonl) maps each fetch, keyed by tender id or
+    # listing page, to the object it returned.
+    def __init__(self, root: str, level: int = 3):
+        self.root = Path(root)
+        self.level = level
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        # zstd contexts aren't thread safe, so each thread keeps its own
+        if not hasattr(self._local, "cctx"):
+            self._local.cctx = zstandard.ZstdCompressor(level=self.level)
+            self._local.dctx = zstandard.ZstdDecompressor()
+        return self._local.cctx
+
+    def _decompressor(self) -> zstandard.ZstdDecompressor:
+        self._compressor()
+        return self._local.dctx
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.zst"
+
+    def put(
+        self,
+        kind: ArchiveKind,
+        key: str,
+        raw: bytes,
+        fetched_at: Optional[datetime] = None,
+    ) -> str:
+        digest = hashlib.sha256(raw).hexdigest()
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so a crash never leaves a truncated object
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(self._compressor().compress(raw))
+            os.replace(tmp, path)
+
+        entry: ArchiveEntry = {
+            "kind": kind,
+            "key": key,
+            "fetchedAt": fetched_at.isoformat(),
+            "sha256": digest,
+        }
+        index = self.root / "index" / kind / f"{fetched_at.date().isoformat()}.jsonl"
+        with self._lock:
+            index.parent.mkdir(parents=True, exist_ok=True)
+            with index.open("a") as f:
+                f.write(json.dumps(entry) + "\n")
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        return self._decompressor().decompress(self._object_path(digest).read_bytes())
+
+    def entries(self, kind: ArchiveKind) -> Iterator[ArchiveEntry]:
+        index = self.root / "index" / kind
+        if not index.is_dir():
+            return
+        for path in sorted(index.glob("*.jsonl")):
+            with path.open() as f:
+                for line in f:
+                    # A run killed mid-append can leave a partial last line
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def latest(self, kind: ArchiveKind) -> Dict[str, ArchiveEntry]:
+        # Newest fetch per key
+        latest: Dict[str, ArchiveEntry] = {}
+        for entry in self.entries(kind):
+            current = latest.get(entry["key"])
+            if current is None or entry["fetchedAt"] >= current["fetchedAt"]:
+                latest[entry["key"]] = entry
+        return latest
+
+    def replay(self, kind: ArchiveKind) -> Iterator[Tuple[ArchiveEntry, dict]]:
+        # Every fetch of `kind` in fetch order, with its parsed body
+        for entry in sorted(self.entries(kind), key=lambda e: e["fetchedAt"]):
+            yield entry, json.loads(self.get(entry["sha256"]))
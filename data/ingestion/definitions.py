@@ -1,149 +1,539 @@
 import asyncio
 import json
-from datetime import datetime
+import os
+from contextlib import aclosing
+from datetime import date, timedelta
+from typing import List, Optional
 
 import dagster as dg
+import httpx
 from dagster_docker import PipesDockerClient
-from sqlalchemy import insert, select
-from sqlalchemy.sql import text
-
-from ingestion.models import MasterTender, NewTender
-from ingestion.resources import DataWarehouseResource, ProxyResource
+from ingestion.archive import RawArchive
+from ingestion.export import ROLLUP_TABLES, SHARDED_TABLES, StaticExporter
+from ingestion.metrics import ScrapeMetrics
+from ingestion.models import MasterTender, NewTender, TenderMetadata
+from ingestion.resources import (
+    ArchiveResource,
+    AuthServiceResource,
+    DataWarehouseResource,
+    ProxyResource,
+    StaticExportResource,
+)
 from ingestion.utils import (
+    AdaptiveLimiter,
+    AuthData,
     AuthRotator,
+    ClientPool,
+    LeaseKeeper,
+    ProxyConf,
     ProxyRotator,
+    ScrapeResult,
+    WriteBehindBuffer,
+    advance_watermark,
+    complete_scrape_jobs,
+    enqueue_scrape_jobs,
+    fail_scrape_jobs,
+    fetch_listing_pages,
+    get_watermark,
+    listing_row,
+    normalize_metadata,
+    oldest_post_date,
+    prune_unchanged_tenders,
+    refresh_award_facts,
+    release_stale_jobs,
+    replay_listing,
+    replay_tenders,
+    scrape_queue_counts,
     scrape_tender,
-    send_authenticated_request,
+    seek_listing_page,
+    stream_claimed_tenders,
+)
+
+
+def mint_auth(
+    context: dg.AssetExecutionContext,
+    docker_pipes_client: PipesDockerClient,
+    auth_service: AuthServiceResource,
+    proxy_conf: Optional[ProxyConf],
+) -> AuthData:
+    if auth_service.url:
+        auth = auth_service.get_auth(proxy_conf)
+    else:
+        # Runs the custom image and returns auth results
+        (auth,) = docker_pipes_client.run(
+            image="auth-scraper",
+            command=["python", "main.py"],
+            env={"PROXY_CONF": json.dumps(proxy_conf)},
+            context=context,
+        ).get_custom_messages()
+
+    if "timings" in auth:
+        context.log.info(
+            "Auth minted: "
+            + ", ".join(f"{k}={v:.2f}s" for k, v in auth["timings"].items())
+        )
+    return auth
+
+
+def require_archive(raw_archive: Optional[RawArchive]) -> RawArchive:
+    if raw_archive is None:
+        raise dg.Failure("Replay needs RAW_ARCHIVE_PATH to point at the raw archive")
+    return raw_archive
+
+
+async def replay_new_tenders(
+    dwh: DataWarehouseResource, raw_archive: RawArchive, start: date, end: date
+) -> dg.MaterializeResult:
+    listing = await asyncio.to_thread(replay_listing, raw_archive, start, end)
+
+    Session = dwh.get_async_session()
+    async with Session() as session:
+        await dwh.bulk_load(
+            session, NewTender.__table__, listing.values(), on_conflict="update"
+        )
+        unchanged = await prune_unchanged_tenders(session, (start, end))
+        queued = await enqueue_scrape_jobs(session, (start, end))
+        await session.commit()
+
+    return dg.MaterializeResult(
+        metadata={
+            "tenders_queued": dg.MetadataValue.int(queued),
+            "unchanged_skipped": dg.MetadataValue.int(unchanged),
+            "records_fetched": dg.MetadataValue.int(len(listing)),
+            "replay": dg.MetadataValue.bool(True),
+        }
+    )
+
+
+async def replay_tender_metadata(
+    dwh: DataWarehouseResource, raw_archive: RawArchive, start: date, end: date
+) -> dg.MaterializeResult:
+    # Decompressing and parsing is CPU bound, keep it off the event loop
+    def load():
+        listing = replay_listing(raw_archive, start, end)
+        return list(replay_tenders(raw_archive, listing))
+
+    rows = await asyncio.to_thread(load)
+
+    Session = dwh.get_async_session()
+    async with Session() as session:
+        stats = await dwh.bulk_load(
+            session,
+            MasterTender.__table__,
+            [master for master, _ in rows],
+            on_conflict="update",
+        )
+        await dwh.bulk_load(
+            session,
+            TenderMetadata.__table__,
+            normalize_metadata.many(metadata for _, metadata in rows),
+            on_conflict="update",
+        )
+        ids = [master["id"] for master, _ in rows]
+        await refresh_award_facts(session, ids)
+        await complete_scrape_jobs(session, ids)
+        await session.commit()
+
+    return dg.MaterializeResult(
+        metadata={
+            "scraped": dg.MetadataValue.int(len(rows)),
+            "rows_written": dg.MetadataValue.int(stats["merged"]),
+            "replay": dg.MetadataValue.bool(True),
+        }
+    )
+
+
+# Both ingestion assets are partitioned by the month a tender was posted, so a
+# backfill fans out into one run per month through the run queue
+tender_partitions = dg.MonthlyPartitionsDefinition(
+    start_date="2016-01-01", end_offset=1
 )
 
 
-@dg.asset(compute_kind="docker", group_name="ingestion")
-def new_tenders(
+class NewTendersConfig(dg.Config):
+    max_records: int = 18000
+    page_size: int = 500
+    max_in_flight: int = 4
+    # Stop paging once the listing is `overlap_days` older than the newest
+    # tender seen by a previous run of the same partition
+    incremental: bool = True
+    overlap_days: int = 3
+    # Rebuild the partition from the raw archive instead of the portal
+    replay: bool = False
+
+
+@dg.asset(
+    compute_kind="docker", group_name="ingestion", partitions_def=tender_partitions
+)
+async def new_tenders(
     context: dg.AssetExecutionContext,
+    config: NewTendersConfig,
     proxy: ProxyResource,
     dwh: DataWarehouseResource,
     docker_pipes_client: PipesDockerClient,
+    auth_service: AuthServiceResource,
+    archive: ArchiveResource,
 ) -> dg.MaterializeResult:
-    max_records = 18000
+    window = context.partition_time_window
+    start, end = window.start.date(), window.end.date()
+    raw_archive = archive.get_archive()
+    if config.replay:
+        return await replay_new_tenders(dwh, require_archive(raw_archive), start, end)
+
+    watermark_name = f"listing:{context.partition_key}"
     proxy_conf = proxy.get_proxy_conf()
-    # Runs the custom image and returns auth results
-    (auth,) = docker_pipes_client.run(
-        image="auth-scraper",
-        command=["python", "main.py"],
-        env={"PROXY_CONF": json.dumps(proxy_conf)},
-        context=context,
-    ).get_custom_messages()
-
-    tenders_json = send_authenticated_request(auth, max_records)
-
-    tenders = tenders_json.get("tenderDataList", [])
-
-    incoming_rows = [
-        {
-            "id": t["id"],
-            "tenderId": t["tenderId"],
-            "title": t.get("title"),
-            "solicitationType": t.get("solicitationType"),
-            "procurementEntity": t.get("procurementEntity"),
-            "endUserEntity": t.get("endUserEntity"),
-            "closingDate": datetime.fromisoformat(t["closingDate"])
-            if t.get("closingDate")
-            else None,
-            "postDate": datetime.fromisoformat(t["postDate"]).date()
-            if t.get("postDate")
-            else None,
-            "tenderStatus": t.get("tenderStatus"),
-        }
-        for t in tenders
-    ]
-
-    ddl = """
-        DROP TABLE IF EXISTS new_tenders;
-
-        CREATE TABLE new_tenders (
-            "id" INTEGER PRIMARY KEY,
-            "tenderId" TEXT,
-            "title" TEXT,
-            "solicitationType" TEXT,
-            "procurementEntity" TEXT,
-            "endUserEntity" TEXT,
-            "closingDate" TIMESTAMP,
-            "postDate" DATE,
-            "tenderStatus" TEXT
-        )
-    """
+    auth = mint_auth(context, docker_pipes_client, auth_service, proxy_conf)
 
-    Session = dwh.get_session()
-    with Session() as session:
-        session.execute(text(ddl))
+    pages = 0
+    records = 0
+    newest = None
 
-        existing_ids = {
-            row[0] for row in session.execute(select(MasterTender.id)).all()
-        }
+    Session = dwh.get_async_session()
+    async with Session() as session:
+        watermark = await get_watermark(session, watermark_name)
+        cutoff = start
+        max_in_flight = config.max_in_flight
+        if config.incremental and watermark is not None:
+            cutoff = max(start, watermark[0] - timedelta(days=config.overlap_days))
+            # A repeat run usually ends on the first page, don't prefetch more
+            max_in_flight = 1
+
+        # Skip the pages newer than this partition
+        start_page = 1
+        if end <= date.today():
+            start_page = await seek_listing_page(
+                auth, end, config.page_size, config.max_records
+            )
 
-        # Filter rows that are not in MasterTender
-        new_rows = [row for row in incoming_rows if row["id"] not in existing_ids]
+        # Rows are streamed into COPY while later pages are still downloading
+        async def incoming_rows():
+            nonlocal pages, records, newest
+            # Closed explicitly so the break below cancels in-flight page fetches
+            async with aclosing(
+                fetch_listing_pages(
+                    auth,
+                    config.page_size,
+                    config.max_records,
+                    max_in_flight,
+                    start_page=start_page,
+                    archive=raw_archive,
+                )
+            ) as listing:
+                async for page in listing:
+                    pages += 1
+                    for t in page:
+                        row = listing_row(t)
+                        if (
+                            row["postDate"] is None
+                            or not start <= row["postDate"] < end
+                        ):
+                            continue
+                        records += 1
+                        key = (row["postDate"], row["id"])
+                        newest = key if newest is None else max(newest, key)
+                        yield row
 
-        if new_rows:
-            session.execute(insert(NewTender), new_rows)
+                    # The listing is sorted newest first, so everything past here
+                    # is older than the partition or was already seen
+                    oldest = oldest_post_date(page)
+                    if oldest is not None and oldest < cutoff:
+                        break
 
-        session.commit()
+        # Every listing row is staged, then tenders already scraped with the
+        # same fingerprint are dropped so only new or changed ones are queued
+        stats = await dwh.bulk_load(
+            session, NewTender.__table__, incoming_rows(), on_conflict="update"
+        )
+        unchanged = await prune_unchanged_tenders(session, (start, end))
+        queued = await enqueue_scrape_jobs(session, (start, end))
+        if newest is not None:
+            await advance_watermark(session, watermark_name, *newest)
+
+        await session.commit()
 
     return dg.MaterializeResult(
         metadata={
-            "new_records_ingested": dg.MetadataValue.int(len(new_rows)),
+            "tenders_queued": dg.MetadataValue.int(queued),
+            "unchanged_skipped": dg.MetadataValue.int(unchanged),
+            "records_fetched": dg.MetadataValue.int(records),
+            "pages_fetched": dg.MetadataValue.int(pages),
+            "start_page": dg.MetadataValue.int(start_page),
+            "incremental": dg.MetadataValue.bool(cutoff > start),
+            "rows_per_sec": dg.MetadataValue.float(
+                stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+            ),
         }
     )
 
 
-@dg.asset(compute_kind="docker", group_name="ingestion", deps=[new_tenders])
+class TenderMetadataConfig(dg.Config):
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    write_batch_size: int = 200
+    write_flush_interval: float = 5.0
+    write_max_pending: int = 1000
+    auth_pool_size: int = 2
+    auth_refresh_at: float = 0.8
+    concurrency_floor: int = 2
+    # Also the HTTP connection pool size, so requests never queue inside httpx
+    # where the wait would count as portal latency for the limiter
+    concurrency_ceiling: int = 40
+    concurrency_initial: int = 10
+    latency_target: float = 3.0
+    claim_batch_size: int = 100
+    claim_lease: int = 600
+    # Claimed rows are streamed in `fetch_size` chunks into a queue of at most
+    # `queue_size` tenders, drained by `concurrency_ceiling` workers
+    fetch_size: int = 50
+    queue_size: int = 100
+    max_attempts: int = 5
+    retry_base_delay: float = 60.0
+    # Rebuild the partition from the raw archive instead of the portal
+    replay: bool = False
+    # Directory for a Prometheus text-format file of the run's scrape metrics
+    metrics_dir: Optional[str] = None
+
+
+@dg.asset(
+    compute_kind="docker",
+    group_name="ingestion",
+    deps=[new_tenders],
+    partitions_def=tender_partitions,
+)
 async def tender_metadata(
     context: dg.AssetExecutionContext,
+    config: TenderMetadataConfig,
     proxy: ProxyResource,
     dwh: DataWarehouseResource,
     docker_pipes_client: PipesDockerClient,
+    auth_service: AuthServiceResource,
+    archive: ArchiveResource,
 ) -> dg.MaterializeResult:
-    parallel_sessions_limit = 10
+    window = context.partition_time_window
+    post_dates = (window.start.date(), window.end.date())
+    raw_archive = archive.get_archive()
+    if config.replay:
+        return await replay_tender_metadata(
+            dwh, require_archive(raw_archive), *post_dates
+        )
+
     proxy_conf = proxy.get_proxy_conf()
+    metrics = ScrapeMetrics()
 
-    async def get_auth():
-        (auth,) = docker_pipes_client.run(
-            image="auth-scraper",
-            command=["python", "main.py"],
-            env={"PROXY_CONF": json.dumps(proxy_conf)},
-            context=context,
-        ).get_custom_messages()
-        return auth
+    def get_auth():
+        return mint_auth(context, docker_pipes_client, auth_service, proxy_conf)
 
-    # Step 1: Get all new tenders
-    sync_session = dwh.get_session()
-    with sync_session() as session:
-        new_tenders = session.execute(select(NewTender)).scalars().all()
+    # Tokens start minting in the background while the backlog is read
+    auth_rotator = AuthRotator(
+        100,
+        get_auth,
+        pool_size=config.auth_pool_size,
+        refresh_at=config.auth_refresh_at,
+        metrics=metrics,
+    )
+    await auth_rotator.warm()
 
-    # Step 2: Process tenders asynchronously
     async_session = dwh.get_async_session()
 
-    semaphore = asyncio.Semaphore(parallel_sessions_limit)
-    proxy_rotator = ProxyRotator(50, proxy.get_proxy_conf)
-    auth_rotator = AuthRotator(100, get_auth)
+    # Step 1: Hand jobs left in flight by a killed run back to the queue
+    async with async_session() as session:
+        released = await release_stale_jobs(
+            session, timedelta(seconds=config.claim_lease), post_dates
+        )
+        await session.commit()
+
+    # Step 2: Claim jobs from the queue and process them asynchronously
+    limiter = AdaptiveLimiter(
+        config.concurrency_floor,
+        config.concurrency_ceiling,
+        initial=config.concurrency_initial,
+        latency_target=config.latency_target,
+    )
+    proxy_rotator = ProxyRotator(50, proxy.get_proxy_conf, metrics)
     timeout = 30
+    clients = ClientPool(
+        timeout,
+        httpx.Limits(
+            max_connections=config.concurrency_ceiling,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        http2=config.http2,
+    )
+
+    async def write_batch(batch: List[ScrapeResult]):
+        done = [r for r in batch if r["error"] is None]
+        failed = [r for r in batch if r["error"] is not None]
+        with metrics.timer("db_commit"):
+            async with async_session() as session:
+                if done:
+                    await dwh.bulk_load(
+                        session,
+                        MasterTender.__table__,
+                        [r["master"] for r in done],
+                        on_conflict="update",
+                    )
+                    await dwh.bulk_load(
+                        session,
+                        TenderMetadata.__table__,
+                        normalize_metadata.many(r["metadata"] for r in done),
+                        on_conflict="update",
+                    )
+                    ids = [r["id"] for r in done]
+                    await refresh_award_facts(session, ids)
+                    await complete_scrape_jobs(session, ids)
+                if failed:
+                    await fail_scrape_jobs(
+                        session, failed, config.max_attempts, config.retry_base_delay
+                    )
+                await session.commit()
+        leases.release(r["id"] for r in batch)
+        metrics.count("tenders_written", len(done))
+
+    claimed = 0
+    scraped = 0
+    backlog: asyncio.Queue = asyncio.Queue(maxsize=config.queue_size)
+    # Claims are renewed well inside the lease until their result is written
+    leases = LeaseKeeper(async_session, config.claim_lease / 3)
+
+    async def produce():
+        nonlocal claimed
+        # Closed straight away on cancellation, releasing the cursor's session
+        async with aclosing(
+            stream_claimed_tenders(
+                async_session,
+                config.claim_batch_size,
+                post_dates,
+                config.fetch_size,
+                leases,
+            )
+        ) as tenders:
+            async for tender in tenders:
+                claimed += 1
+                await backlog.put(tender)
+        for _ in range(config.concurrency_ceiling):
+            await backlog.put(None)
+
+    async def work(writer: WriteBehindBuffer):
+        nonlocal scraped
+        while (tender := await backlog.get()) is not None:
+            scraped += await scrape_tender(
+                tender,
+                proxy_rotator,
+                auth_rotator,
+                clients,
+                limiter,
+                writer,
+                raw_archive,
+                metrics,
+            )
+
+    # The producer blocks once the queue is full, so memory stays flat however
+    # deep the backlog is. The limiter still decides how many workers are
+    # actually inside a request at once.
+    try:
+        async with (
+            leases,
+            WriteBehindBuffer(
+                write_batch,
+                batch_size=config.write_batch_size,
+                flush_interval=config.write_flush_interval,
+                max_pending=config.write_max_pending,
+            ) as writer,
+        ):
+            tasks = [asyncio.create_task(produce())] + [
+                asyncio.create_task(work(writer))
+                for _ in range(config.concurrency_ceiling)
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                # The first failure cancels the rest, so a dead worker can't
+                # leave the producer blocked on a full queue
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await clients.aclose()
+        auth_rotator.close()
+
+    async with async_session() as session:
+        queue = await scrape_queue_counts(session)
+
+    metadata = metrics.to_metadata()
+    if config.metrics_dir:
+        path = metrics.write_prometheus(
+            os.path.join(config.metrics_dir, f"tender_metadata_{context.run_id}.prom"),
+            {"partition": context.partition_key, "run_id": context.run_id},
+        )
+        metadata["metrics_file"] = dg.MetadataValue.path(str(path))
+
+    stats = writer.stats
+    return dg.MaterializeResult(
+        metadata={
+            **metadata,
+            "claimed": dg.MetadataValue.int(claimed),
+            "scraped": dg.MetadataValue.int(scraped),
+            "released_stale": dg.MetadataValue.int(released),
+            "queue_pending": dg.MetadataValue.int(
+                queue.get("pending", 0) + queue.get("failed", 0)
+            ),
+            "queue_dead": dg.MetadataValue.int(queue.get("dead", 0)),
+            "queue_done": dg.MetadataValue.int(queue.get("done", 0)),
+            "rows_written": dg.MetadataValue.int(stats["rows"]),
+            "flushes": dg.MetadataValue.int(stats["flushes"]),
+            "rows_per_sec": dg.MetadataValue.float(
+                stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+            ),
+            "concurrency_limit": dg.MetadataValue.int(limiter.limit),
+            "concurrency_min": dg.MetadataValue.int(limiter.min_limit),
+            "concurrency_max": dg.MetadataValue.int(limiter.max_limit),
+            "concurrency_decreases": dg.MetadataValue.int(limiter.decreases),
+        }
+    )
 
-    tasks = [
-        scrape_tender(t, proxy_rotator, auth_rotator, async_session, timeout, semaphore)
-        for t in new_tenders
-    ]
-    await asyncio.gather(*tasks)
 
+@dg.asset(
+    compute_kind="python",
+    group_name="export",
+    deps=[dg.AssetKey(table) for table in [*SHARDED_TABLES.values(), *ROLLUP_TABLES]],
+    automation_condition=dg.AutomationCondition.eager(),
+)
+async def static_export(
+    context: dg.AssetExecutionContext,
+    dwh: DataWarehouseResource,
+    export: StaticExportResource,
+) -> dg.MaterializeResult:
+    pool = await dwh.create_pool(min_size=1, max_size=2)
+    try:
+        stats = await StaticExporter(
+            pool,
+            export.path,
+            export.dbt_schema,
+            retain=timedelta(seconds=export.retain_seconds),
+        ).export()
+    finally:
+        await pool.close()
+
+    context.log.info(
+        f"Wrote {stats['written']} shards, {stats['unchanged']} unchanged, "
+        f"kept {stats['retained']} superseded, removed {stats['removed']}"
+    )
     return dg.MaterializeResult(
         metadata={
-            "new_tenders": dg.MetadataValue.int(len(new_tenders)),
-            "tasks": dg.MetadataValue.int(len(tasks)),
+            "shards_written": dg.MetadataValue.int(stats["written"]),
+            "shards_unchanged": dg.MetadataValue.int(stats["unchanged"]),
+            "shards_retained": dg.MetadataValue.int(stats["retained"]),
+            "shards_removed": dg.MetadataValue.int(stats["removed"]),
+            "bytes_written": dg.MetadataValue.int(stats["bytes_written"]),
+            "path": dg.MetadataValue.path(export.path),
         }
     )
 
 
 defs = dg.Definitions(
-    assets=[new_tenders, tender_metadata],
+    assets=[new_tenders, tender_metadata, static_export],
     resources={
         "dwh": DataWarehouseResource(
             username=dg.EnvVar("DWH_POSTGRES_USER"),
@@ -155,5 +545,10 @@ defs = dg.Definitions(
             password=dg.EnvVar("PROXY_PASSWORD"),
         ),
         "docker_pipes_client": PipesDockerClient(),
+        "auth_service": AuthServiceResource(url=os.getenv("AUTH_SERVICE_URL")),
+        "archive": ArchiveResource(path=os.getenv("RAW_ARCHIVE_PATH")),
+        "export": StaticExportResource(
+            path=os.getenv("STATIC_EXPORT_PATH", "/tmp/static_export")
+        ),
     },
 )
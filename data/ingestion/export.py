@@ -0,0 +1,218 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
+
+import asyncpg
+
+# Exported dbt models. Sharded tables are split by posting year and
+# procurement entity, rollups are small enough to ship whole.
+SHARDED_TABLES = {"tenders": "fct_tenders", "awards": "fct_awards"}
+# Stable row order keeps unchanged data byte-identical between exports
+SORT_KEYS = {
+    "fct_tenders": "post_month, tender_id",
+    "fct_awards": "post_month, tender_id, award_index",
+    "rollup_monthly": "post_month",
+    "rollup_entity_monthly": "post_month, procurement_entity",
+    "rollup_solicitation_type_monthly": "post_month, solicitation_type",
+    "rollup_unspsc_monthly": "post_month, unspsc_code, unspsc_description",
+}
+ROLLUP_TABLES = [table for table in SORT_KEYS if table.startswith("rollup_")]
+
+Partition = Tuple[Optional[int], Optional[str]]
+
+
+class ShardEntry(TypedDict):
+    table: str
+    year: Optional[int]
+    entity: Optional[str]
+    file: str
+    rows: int
+    bytes: int
+    source: str
+
+
+class ExportStats(TypedDict):
+    written: int
+    unchanged: int
+    retained: int
+    removed: int
+    bytes_written: int
+
+
+def entity_slug(entity: Optional[str]) -> str:
+    # Readable and filesystem safe, with a short hash so entities that
+    # slugify the same still get separate shards
+    if entity is None:
+        return "unknown"
+    readable = re.sub(r"[^a-z0-9]+", "-", entity.lower()).strip("-")[:48]
+    return f"{readable}-{hashlib.md5(entity.encode()).hexdigest()[:6]}"
+
+
+def encode_shard(rows: List[Dict[str, Any]]) -> bytes:
+    # mtime=0 keeps the output byte-identical for identical rows
+    data = json.dumps(rows, default=str, separators=(",", ":")).encode()
+    return gzip.compress(data, mtime=0)
+
+
+class StaticExporter:
+    # Writes gzip JSON shards plus a manifest.json that maps each source
+    # partition to its current file. Shard names embed a content hash, so
+    # files can be cached forever and only the manifest has to be revalidated.
+    # A shard is rewritten only when its partition's row count or latest
+    # imported_at moved since the previous export. Superseded shards stay on
+    # disk for `retain`, so clients holding a cached manifest can still fetch
+    # what it points at.
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        root: str,
+        schema: str = "analytics",
+        retain: timedelta = timedelta(days=1),
+    ):
+        self.pool = pool
+        self.root = Path(root)
+        self.schema = schema
+        self.retain = retain
+        self.manifest_path = self.root / "manifest.json"
+
+    def _load_manifest(self) -> Tuple[Dict[str, ShardEntry], Dict[str, str]]:
+        # Current shards, and superseded files with the time they were retired
+        if not self.manifest_path.exists():
+            return {}, {}
+        manifest = json.loads(self.manifest_path.read_text())
+        return manifest["shards"], manifest.get("retired", {})
+
+    def _write(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    async def _partition_sources(self, table: str) -> Dict[Partition, str]:
+        rows = await self.pool.fetch(
+            "SELECT extract(year FROM post_month)::int AS year, "
+            "procurement_entity AS entity, "
+            "max(imported_at)::text || '|' || count(*) AS source "
+            f"FROM {self.schema}.{table} GROUP BY 1, 2"
+        )
+        return {(r["year"], r["entity"]): r["source"] for r in rows}
+
+    async def _partition_rows(
+        self, table: str, year: Optional[int], entity: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        if year is None:
+            period, args = "post_month IS NULL", [entity]
+        else:
+            period = "post_month >= make_date($2, 1, 1) AND post_month < make_date($2 + 1, 1, 1)"
+            args = [entity, year]
+        rows = await self.pool.fetch(
+            f"SELECT * FROM {self.schema}.{table} "
+            f"WHERE procurement_entity IS NOT DISTINCT FROM $1 AND {period} "
+            f"ORDER BY {SORT_KEYS[table]}",
+            *args,
+        )
+        return [dict(r) for r in rows]
+
+    async def _rollup_source(self, table: str) -> str:
+        return await self.pool.fetchval(
+            "SELECT coalesce(max(source_imported_at)::text, '') || '|' || count(*) "
+            f"FROM {self.schema}.{table}"
+        )
+
+    async def _rollup_rows(self, table: str) -> List[Dict[str, Any]]:
+        rows = await self.pool.fetch(
+            f"SELECT * FROM {self.schema}.{table} ORDER BY {SORT_KEYS[table]}"
+        )
+        return [dict(r) for r in rows]
+
+    async def _store(self, key: str, rows: List[Dict[str, Any]]) -> Tuple[str, int]:
+        data = await asyncio.to_thread(encode_shard, rows)
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        name = f"{key}.{digest}.json.gz"
+        await asyncio.to_thread(self._write, self.root / name, data)
+        return name, len(data)
+
+    async def export(self) -> ExportStats:
+        previous, retired = self._load_manifest()
+        current: Dict[str, ShardEntry] = {}
+        stats: ExportStats = {
+            "written": 0,
+            "unchanged": 0,
+            "retained": 0,
+            "removed": 0,
+            "bytes_written": 0,
+        }
+
+        async def sync(key: str, entry: dict, source: str, load):
+            old = previous.get(key)
+            if old is not None and old["source"] == source:
+                current[key] = old
+                stats["unchanged"] += 1
+                return
+            rows = await load()
+            name, size = await self._store(key, rows)
+            current[key] = {
+                **entry,
+                "file": name,
+                "rows": len(rows),
+                "bytes": size,
+                "source": source,
+            }
+            stats["written"] += 1
+            stats["bytes_written"] += size
+
+        for prefix, table in SHARDED_TABLES.items():
+            for (year, entity), source in (
+                await self._partition_sources(table)
+            ).items():
+                key = f"{prefix}/{year or 'undated'}/{entity_slug(entity)}"
+                await sync(
+                    key,
+                    {"table": table, "year": year, "entity": entity},
+                    source,
+                    lambda t=table, y=year, e=entity: self._partition_rows(t, y, e),
+                )
+
+        for table in ROLLUP_TABLES:
+            await sync(
+                f"rollups/{table}",
+                {"table": table, "year": None, "entity": None},
+                await self._rollup_source(table),
+                lambda t=table: self._rollup_rows(t),
+            )
+
+        now = datetime.now(timezone.utc)
+        live = {entry["file"] for entry in current.values()}
+        for entry in previous.values():
+            if entry["file"] not in live:
+                retired.setdefault(entry["file"], now.isoformat())
+        # A shard whose content comes back gets its old name, and is live again
+        retired = {f: at for f, at in retired.items() if f not in live}
+        expired = [
+            f
+            for f, at in retired.items()
+            if datetime.fromisoformat(at) < now - self.retain
+        ]
+        for f in expired:
+            del retired[f]
+        stats["retained"] = len(retired)
+
+        manifest = {
+            "generatedAt": now.isoformat(),
+            "shards": current,
+            "retired": retired,
+        }
+        self._write(self.manifest_path, json.dumps(manifest, indent=1).encode())
+
+        # Files are only removed once the new manifest no longer points at them
+        for f in expired:
+            (self.root / f).unlink(missing_ok=True)
+            stats["removed"] += 1
+
+        return stats
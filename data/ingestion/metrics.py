@@ -0,0 +1,157 @@
+import bisect
+import math
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import dagster as dg
+
+# Seconds, upper bounds in the style of Prometheus' default buckets
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    math.inf,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        # Linear interpolation inside the bucket holding the q-th observation,
+        # the same estimate as PromQL's histogram_quantile
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i]
+                if math.isinf(upper):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return None
+
+
+class ScrapeMetrics:
+    # In-memory counters and latency histograms for one run. Everything happens
+    # on the event loop, so no locking. Phases are timed with `timer`, counters
+    # take string labels like status="429".
+    def __init__(self, prefix: str = "tender_scrape"):
+        self.prefix = prefix
+        self.counters: Counter = Counter()
+        self.histograms: Dict[str, Histogram] = {}
+        self.started = time.time()
+
+    def count(self, name: str, n: int = 1, **labels: str):
+        self.counters[(name, tuple(sorted(labels.items())))] += n
+
+    def observe(self, phase: str, seconds: float):
+        if phase not in self.histograms:
+            self.histograms[phase] = Histogram()
+        self.histograms[phase].observe(seconds)
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def counter_total(self, name: str) -> int:
+        return sum(n for (key, _), n in self.counters.items() if key == name)
+
+    def to_metadata(self) -> Dict[str, dg.MetadataValue]:
+        metadata: Dict[str, dg.MetadataValue] = {}
+        for (name, labels), n in sorted(self.counters.items()):
+            suffix = "".join(f"_{value}" for _, value in labels)
+            metadata[f"{name}{suffix}"] = dg.MetadataValue.int(n)
+        for phase, histogram in sorted(self.histograms.items()):
+            metadata[f"{phase}_seconds_total"] = dg.MetadataValue.float(
+                round(histogram.sum, 3)
+            )
+            for q in (0.5, 0.95, 0.99):
+                value = histogram.quantile(q)
+                if value is not None:
+                    metadata[f"{phase}_p{int(q * 100)}"] = dg.MetadataValue.float(
+                        round(value, 4)
+                    )
+        return metadata
+
+    def to_prometheus(self, labels: Dict[str, str]) -> str:
+        def render(extra: Labels = ()) -> str:
+            pairs = [*labels.items(), *extra]
+            if not pairs:
+                return ""
+            escaped = (
+                (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs
+            )
+            return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+        lines: List[str] = []
+        for name in sorted({name for name, _ in self.counters}):
+            metric = f"{self.prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (key, extra), n in sorted(self.counters.items()):
+                if key == name:
+                    lines.append(f"{metric}{render(extra)} {n}")
+
+        if self.histograms:
+            metric = f"{self.prefix}_phase_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for phase, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(histogram.buckets, histogram.counts):
+                    cumulative += n
+                    le = "+Inf" if math.isinf(bound) else repr(bound)
+                    lines.append(
+                        f"{metric}_bucket{render((('phase', phase), ('le', le)))} {cumulative}"
+                    )
+                lines.append(
+                    f"{metric}_sum{render((('phase', phase),))} {histogram.sum:.6f}"
+                )
+                lines.append(
+                    f"{metric}_count{render((('phase', phase),))} {histogram.count}"
+                )
+
+        metric = f"{self.prefix}_run_start_timestamp_seconds"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric}{render()} {self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, labels: Dict[str, str]) -> Path:
+        # Written then renamed, so a textfile collector never reads half a file
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(self.to_prometheus(labels))
+        os.replace(tmp, target)
+        return target
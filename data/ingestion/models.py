@@ -1,17 +1,35 @@
 from datetime import datetime, date
+from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import Integer, func, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy import (
+    Computed,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    Integer,
+    Numeric,
+    func,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english', "
+    "coalesce(memo, '') || ' ' || coalesce(\"awardMemo\", '')), 'C')"
+)
+
+
 class Base(DeclarativeBase):
     pass
 
 
 class NewTender(Base):
     __tablename__ = "new_tenders"
+    __table_args__ = (Index("ix_new_tenders_post_date", "postDate"),)
 
     id = mapped_column(Integer, primary_key=True)
     tenderId: Mapped[str]
@@ -22,10 +40,20 @@ class NewTender(Base):
     closingDate: Mapped[Optional[datetime]]
     postDate: Mapped[Optional[date]]
     tenderStatus: Mapped[Optional[str]]
+    modifiedDate: Mapped[Optional[datetime]]
+    # md5 over the listing fields that signal a change worth re-scraping
+    fingerprint: Mapped[Optional[str]]
 
 
 class MasterTender(Base):
     __tablename__ = "master_tenders"
+    __table_args__ = (
+        Index("ix_master_tenders_post_date_id", "postDate", "id"),
+        Index("ix_master_tenders_closing_date", "closingDate"),
+        Index("ix_master_tenders_procurement_entity", "procurementEntity"),
+        Index("ix_master_tenders_tender_status", "tenderStatus"),
+        Index("ix_master_tenders_imported_at", "importedAt"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     tenderId: Mapped[str]
@@ -36,7 +64,11 @@ class MasterTender(Base):
     closingDate: Mapped[Optional[datetime]]
     postDate: Mapped[Optional[date]]
     tenderStatus: Mapped[Optional[str]]
-    importedAt: Mapped[datetime] = mapped_column(default=func.now())
+    # Listing fingerprint at the time of the last scrape
+    fingerprint: Mapped[Optional[str]]
+    importedAt: Mapped[datetime] = mapped_column(
+        default=func.now(), onupdate=func.now()
+    )
     tenderMetadata: Mapped["TenderMetadata"] = relationship(
         back_populates="tender", cascade="all, delete-orphan"
     )
@@ -44,6 +76,22 @@ class MasterTender(Base):
 
 class TenderMetadata(Base):
     __tablename__ = "tender_metadata"
+    __table_args__ = (
+        Index("ix_tender_metadata_closing_date", "closingDate"),
+        Index(
+            "ix_tender_metadata_unspsc_level_data",
+            "unspscLevelData",
+            postgresql_using="gin",
+            postgresql_ops={"unspscLevelData": "jsonb_path_ops"},
+        ),
+        Index(
+            "ix_tender_metadata_tender_award_data",
+            "tenderAwardData",
+            postgresql_using="gin",
+            postgresql_ops={"tenderAwardData": "jsonb_path_ops"},
+        ),
+        Index("ix_tender_metadata_search", "searchVector", postgresql_using="gin"),
+    )
     id: Mapped[int] = mapped_column(ForeignKey("master_tenders.id"), primary_key=True)
     tender: Mapped["MasterTender"] = relationship(
         back_populates="tenderMetadata", single_parent=True
@@ -65,12 +113,12 @@ class TenderMetadata(Base):
     endUserEntity: Mapped[Optional[str]]
     endUserEntityOrganizationId: Mapped[Optional[str]]
     tenderUrl: Mapped[Optional[str]]
-    closingDate: Mapped[Optional[str]]
+    closingDate: Mapped[Optional[datetime]]
     closingTime: Mapped[Optional[str]]
     closingDateDisplay: Mapped[Optional[str]]
     description: Mapped[Optional[str]]
     memo: Mapped[Optional[str]]
-    issuedDate: Mapped[Optional[str]]
+    issuedDate: Mapped[Optional[datetime]]
     tenderStatus: Mapped[Optional[str]]
     expectedDurationOfContract: Mapped[Optional[int]]
     pickUpFee: Mapped[Optional[str]]
@@ -79,12 +127,12 @@ class TenderMetadata(Base):
     sustainablePrimarySource: Mapped[Optional[str]]
     closingLocation: Mapped[Optional[str]]
     closingLocationOtherText: Mapped[Optional[str]]
-    publicOpeningDate: Mapped[Optional[str]]
+    publicOpeningDate: Mapped[Optional[datetime]]
     publicOpeningTime: Mapped[Optional[str]]
     publicOpeningLocation: Mapped[Optional[str]]
     submissionLanguage: Mapped[Optional[str]]
     awardMemo: Mapped[Optional[str]]
-    postDate: Mapped[Optional[str]]
+    postDate: Mapped[Optional[date]]
 
     # Complex/Nested fields as JSONB
     contactMethod: Mapped[Optional[dict]] = mapped_column(JSONB)
@@ -98,3 +146,81 @@ class TenderMetadata(Base):
     procurementContactMethod: Mapped[Optional[dict]] = mapped_column(JSONB)
     informationInDocument: Mapped[Optional[dict]] = mapped_column(JSONB)
     relevantRegions: Mapped[Optional[dict]] = mapped_column(JSONB)
+
+    # Maintained by Postgres, weighted title > description > memos
+    searchVector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, Computed(SEARCH_VECTOR, persisted=True)
+    )
+
+
+class ScrapeJob(Base):
+    __tablename__ = "scrape_queue"
+    __table_args__ = (Index("ix_scrape_queue_state_next", "state", "nextAttemptAt"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    # pending -> in_flight -> done, or failed (retried after backoff) -> dead
+    state: Mapped[str] = mapped_column(server_default="pending")
+    attempts: Mapped[int] = mapped_column(server_default="0")
+    lastError: Mapped[Optional[str]]
+    nextAttemptAt: Mapped[datetime] = mapped_column(server_default=func.now())
+    claimedAt: Mapped[Optional[datetime]]
+    updatedAt: Mapped[datetime] = mapped_column(server_default=func.now())
+
+
+class ListingWatermark(Base):
+    __tablename__ = "listing_watermarks"
+
+    # Newest (postDate, id) seen in the portal listing, per listing scope
+    name: Mapped[str] = mapped_column(primary_key=True)
+    postDate: Mapped[date]
+    tenderId: Mapped[int]
+    updatedAt: Mapped[datetime] = mapped_column(server_default=func.now())
+
+
+class TenderAward(Base):
+    __tablename__ = "tender_awards"
+    __table_args__ = (Index("ix_tender_awards_vendor_name", "vendorName"),)
+
+    # One row per element of tender_metadata.tenderAwardData
+    masterTenderId: Mapped[int] = mapped_column(
+        ForeignKey("master_tenders.id", ondelete="CASCADE"), primary_key=True
+    )
+    awardIndex: Mapped[int] = mapped_column(primary_key=True)
+    vendorName: Mapped[Optional[str]]
+    awardAmount: Mapped[Optional[Decimal]] = mapped_column(Numeric)
+    raw: Mapped[dict] = mapped_column(JSONB)
+
+
+class TenderAwardItem(Base):
+    __tablename__ = "tender_award_items"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["masterTenderId", "awardIndex"],
+            ["tender_awards.masterTenderId", "tender_awards.awardIndex"],
+            ondelete="CASCADE",
+        ),
+    )
+
+    # One row per element of an award's awardItems
+    masterTenderId: Mapped[int] = mapped_column(primary_key=True)
+    awardIndex: Mapped[int] = mapped_column(primary_key=True)
+    itemIndex: Mapped[int] = mapped_column(primary_key=True)
+    description: Mapped[Optional[str]]
+    quantity: Mapped[Optional[Decimal]] = mapped_column(Numeric)
+    unitPrice: Mapped[Optional[Decimal]] = mapped_column(Numeric)
+    amount: Mapped[Optional[Decimal]] = mapped_column(Numeric)
+    raw: Mapped[dict] = mapped_column(JSONB)
+
+
+class TenderBid(Base):
+    __tablename__ = "tender_bids"
+    __table_args__ = (Index("ix_tender_bids_bidder_name", "bidderName"),)
+
+    # One row per element of tender_metadata.tenderBidInformationDataList
+    masterTenderId: Mapped[int] = mapped_column(
+        ForeignKey("master_tenders.id", ondelete="CASCADE"), primary_key=True
+    )
+    bidIndex: Mapped[int] = mapped_column(primary_key=True)
+    bidderName: Mapped[Optional[str]]
+    bidAmount: Mapped[Optional[Decimal]] = mapped_column(Numeric)
+    raw: Mapped[dict] = mapped_column(JSONB)
@@ -0,0 +1,99 @@
+import json
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, DateTime, Integer, String, Table
+from sqlalchemy.dialects.postgresql import JSONB
+
+Converter = Callable[[Any], Any]
+
+# Tried in order when the fast ISO path fails
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+
+
+@lru_cache(maxsize=4096)
+def _parse_datetime(value: str) -> Optional[datetime]:
+    # Most portal timestamps are ISO formatted, and many tenders share them
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def to_datetime(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return _parse_datetime(value) if value else None
+    return None
+
+
+def to_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    parsed = to_datetime(value)
+    return parsed.date() if parsed else None
+
+
+def to_int(value: Any) -> Optional[int]:
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_str(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def converter_for(column_type) -> Optional[Converter]:
+    # JSONB and unknown types pass through untouched
+    if isinstance(column_type, JSONB):
+        return None
+    if isinstance(column_type, DateTime):
+        return to_datetime
+    if isinstance(column_type, Date):
+        return to_date
+    if isinstance(column_type, Integer):
+        return to_int
+    if isinstance(column_type, String):
+        return to_str
+    return None
+
+
+class Normalizer:
+    # Projects raw portal records onto a table's columns, converting each field
+    # to its column type. The projection and converters are worked out once
+    # per table instead of per record. Generated columns are left to Postgres.
+    # Values that can't be converted become NULL, the raw archive keeps the
+    # original.
+    def __init__(self, table: Table):
+        self.table = table
+        self.fields: Tuple[Tuple[str, Optional[Converter]], ...] = tuple(
+            (c.name, converter_for(c.type)) for c in table.columns if c.computed is None
+        )
+
+    def __call__(self, record: dict) -> dict:
+        get = record.get
+        return {
+            name: convert(get(name)) if convert else get(name)
+            for name, convert in self.fields
+        }
+
+    def many(self, records: Iterable[dict]) -> List[dict]:
+        return [self(record) for record in records]
@@ -1,14 +1,71 @@
 import asyncio
-import random
-from datetime import datetime
-from typing import Awaitable, Callable, Dict, List, Optional, TypedDict
+import base64
+import hashlib
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Set,
+    Tuple,
+    TypedDict,
+    Union,
+)
 from urllib.parse import quote
 
 import httpx
 from dagster import get_dagster_logger
+from sqlalchemy import (
+    Boolean,
+    Numeric,
+    bindparam,
+    case,
+    cast,
+    column,
+    delete,
+    exists,
+    func,
+    or_,
+    select,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from ingestion.models import MasterTender, NewTender, TenderMetadata
+from ingestion.archive import RawArchive
+from ingestion.metrics import ScrapeMetrics
+from ingestion.models import (
+    ListingWatermark,
+    MasterTender,
+    NewTender,
+    ScrapeJob,
+    TenderAward,
+    TenderAwardItem,
+    TenderBid,
+    TenderMetadata,
+)
+from ingestion.normalize import Normalizer
+
+
+# Overridable so runs can be pointed at a local stand-in portal
+PORTAL_URL = os.getenv("PORTAL_URL", "https://procurement-portal.novascotia.ca")
 
 
 class ProxyConf(TypedDict):
@@ -17,29 +74,19 @@ class ProxyConf(TypedDict):
     password: str
 
 
-class AuthData(TypedDict):
+class AuthTimings(TypedDict, total=False):
+    # Per-phase seconds reported by the auth scraper
+    timings: Dict[str, float]
+
+
+class AuthData(AuthTimings):
     jwt: str
     cookies: List[Dict]
     user_agent: str
 
 
-def coerce_dates(data: dict, date_fields: List[str]) -> dict:
-    def parse(value):
-        if value and isinstance(value, str):
-            try:
-                return datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f")
-            except ValueError:
-                try:
-                    return datetime.strptime(value, "%Y-%m-%d")
-                except ValueError:
-                    return value
-        return value
-
-    return {k: parse(v) if k in date_fields else v for k, v in data.items()}
-
-
-def send_authenticated_request(auth_data: AuthData, records: int):
-    headers = {
+def portal_headers(auth_data: AuthData) -> Dict[str, str]:
+    return {
         "Accept": "application/json, text/plain, */*",
         "Authorization": f"Bearer {auth_data['jwt']}",
         "Connection": "keep-alive",
@@ -47,153 +94,1066 @@ def send_authenticated_request(auth_data: AuthData, records: int):
         "Sec-Fetch-Dest": "empty",
         "Sec-Fetch-Mode": "cors",
         "Sec-Fetch-Site": "same-origin",
-        "Origin": "https://procurement-portal.novascotia.ca",
-        "Referer": "https://procurement-portal.novascotia.ca/tenders",
+        "Origin": PORTAL_URL,
+        "Referer": f"{PORTAL_URL}/tenders",
         "User-Agent": auth_data["user_agent"],
     }
 
-    url = f"https://procurement-portal.novascotia.ca/procurementui/tenders?page=1&numberOfRecords={records}&sortType=POSTED_DATE_DESC&keyword="
-    body = {"filters": [{"key": "tenderStatus", "values": ["AWARDED"]}]}
 
+def portal_cookies(auth_data: AuthData) -> httpx.Cookies:
     cookies = httpx.Cookies()
     for cookie in auth_data["cookies"]:
         cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"])
+    return cookies
+
+
+def listing_fingerprint(row: dict) -> str:
+    fields = [
+        row["tenderStatus"],
+        row["closingDate"].isoformat() if row["closingDate"] else None,
+        row["title"],
+        row["procurementEntity"],
+        row["endUserEntity"],
+    ]
+    return hashlib.md5(json.dumps(fields).encode()).hexdigest()
+
+
+def listing_row(tender: dict) -> dict:
+    row = {
+        "id": tender["id"],
+        "tenderId": tender["tenderId"],
+        "title": tender.get("title"),
+        "solicitationType": tender.get("solicitationType"),
+        "procurementEntity": tender.get("procurementEntity"),
+        "endUserEntity": tender.get("endUserEntity"),
+        "closingDate": datetime.fromisoformat(tender["closingDate"])
+        if tender.get("closingDate")
+        else None,
+        "postDate": datetime.fromisoformat(tender["postDate"]).date()
+        if tender.get("postDate")
+        else None,
+        "tenderStatus": tender.get("tenderStatus"),
+        "modifiedDate": datetime.fromisoformat(tender["modifiedDate"])
+        if tender.get("modifiedDate")
+        else None,
+    }
+    row["fingerprint"] = listing_fingerprint(row)
+    return row
+
+
+async def fetch_listing_page(
+    client: httpx.AsyncClient,
+    page: int,
+    page_size: int,
+    retries: int = 3,
+    archive: Optional[RawArchive] = None,
+) -> List[dict]:
+    url = f"{PORTAL_URL}/procurementui/tenders?page={page}&numberOfRecords={page_size}&sortType=POSTED_DATE_DESC&keyword="
+    body = {"filters": [{"key": "tenderStatus", "values": ["AWARDED"]}]}
+
+    log = get_dagster_logger()
+    for attempt in range(1, retries + 1):
+        try:
+            response = await client.post(url, json=body)
+            response.raise_for_status()
+            data = response.json()
+            if archive is not None:
+                await asyncio.to_thread(
+                    archive.put, "listing", str(page), response.content
+                )
+            return data.get("tenderDataList", [])
+        except (httpx.HTTPError, ValueError) as e:
+            # A truncated body surfaces as a ValueError from the JSON decoder
+            if attempt == retries:
+                raise
+            log.warning(
+                f"Listing page {page} failed (attempt {attempt}/{retries}): {e}, Type: {type(e).__name__}"
+            )
+            await asyncio.sleep(2**attempt)
+
+    return []
+
+
+def listing_client(
+    auth_data: AuthData, max_connections: int, timeout: int = 30
+) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        cookies=portal_cookies(auth_data),
+        headers=portal_headers(auth_data),
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=max_connections),
+    )
+
 
-    with httpx.Client(cookies=cookies, headers=headers, timeout=30) as client:
-        response = client.post(url, json=body)
-        response.raise_for_status()
-        return response.json()
+def oldest_post_date(page: List[dict]) -> Optional[date]:
+    for tender in reversed(page):
+        post_date = listing_row(tender)["postDate"]
+        if post_date is not None:
+            return post_date
+    return None
+
+
+async def seek_listing_page(
+    auth_data: AuthData,
+    before: date,
+    page_size: int,
+    max_records: int,
+    timeout: int = 30,
+) -> int:
+    # The listing has no date filter, but it is sorted newest first. Binary
+    # search for the first page that reaches back past `before`, so a month
+    # deep in the history costs a handful of probes instead of a full sweep.
+    lo, hi = 1, -(-max_records // page_size)
+    async with listing_client(auth_data, 1, timeout) as client:
+        while lo < hi:
+            mid = (lo + hi) // 2
+            page = await fetch_listing_page(client, mid, page_size)
+            oldest = oldest_post_date(page)
+            if not page or (oldest is not None and oldest < before):
+                hi = mid
+            else:
+                lo = mid + 1
+    return lo
+
+
+async def fetch_listing_pages(
+    auth_data: AuthData,
+    page_size: int,
+    max_records: int,
+    max_in_flight: int,
+    timeout: int = 30,
+    start_page: int = 1,
+    archive: Optional[RawArchive] = None,
+) -> AsyncIterator[List[dict]]:
+    # Pages are yielded in portal order while up to `max_in_flight` later pages
+    # are already downloading. The first short page marks the end of the listing.
+    last_page = -(-max_records // page_size)
+
+    async with listing_client(auth_data, max_in_flight, timeout) as client:
+        pending: Deque[asyncio.Task] = deque()
+        next_page = start_page
+        try:
+            while pending or next_page <= last_page:
+                while len(pending) < max_in_flight and next_page <= last_page:
+                    pending.append(
+                        asyncio.create_task(
+                            fetch_listing_page(
+                                client, next_page, page_size, archive=archive
+                            )
+                        )
+                    )
+                    next_page += 1
+
+                page = await pending.popleft()
+                if page:
+                    yield page
+                if len(page) < page_size:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def get_watermark(session: AsyncSession, name: str) -> Optional[Tuple[date, int]]:
+    row = (
+        await session.execute(
+            select(ListingWatermark.postDate, ListingWatermark.tenderId).where(
+                ListingWatermark.name == name
+            )
+        )
+    ).one_or_none()
+    return (row.postDate, row.tenderId) if row else None
+
+
+async def advance_watermark(
+    session: AsyncSession, name: str, post_date: date, tender_id: int
+):
+    # Only ever moves forward, an older listing window never rewinds it
+    stmt = insert(ListingWatermark).values(
+        name=name, postDate=post_date, tenderId=tender_id
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ListingWatermark.name],
+        set_={
+            "postDate": stmt.excluded.postDate,
+            "tenderId": stmt.excluded.tenderId,
+            "updatedAt": func.now(),
+        },
+        where=tuple_(ListingWatermark.postDate, ListingWatermark.tenderId)
+        < tuple_(stmt.excluded.postDate, stmt.excluded.tenderId),
+    )
+    await session.execute(stmt)
 
 
 class ProxyRotator:
-    def __init__(self, limit: int, get_config: Callable[[], ProxyConf]):
+    def __init__(
+        self,
+        limit: int,
+        get_config: Callable[[], Optional[ProxyConf]],
+        metrics: Optional[ScrapeMetrics] = None,
+    ):
         self._limit = limit
+        self._metrics = metrics or ScrapeMetrics()
         self._lock = asyncio.Lock()
         self._request_count = 0
         self._get_config = get_config
         self._proxy_conf = self._get_config()
 
-    async def get_proxy(self) -> str:
+    async def get_proxy(self) -> Optional[str]:
         async with self._lock:
             self._request_count += 1
             if self._request_count >= self._limit:
                 self._proxy_conf = self._get_config()
                 self._request_count = 0
+                self._metrics.count("proxy_rotations")
+            if self._proxy_conf is None:
+                return None
             return f"http://{self._proxy_conf['username']}:{self._proxy_conf['password']}@{self._proxy_conf['server']}"
 
 
+def jwt_expiry(token: str) -> Optional[float]:
+    # Reads the unverified `exp` claim, we only need it to schedule refreshes
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(
+            base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+        )
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class PooledAuth(TypedDict):
+    auth: AuthData
+    uses: int
+    expires_at: Optional[float]
+
+
 class AuthRotator:
-    def __init__(self, limit: int, get_auth: Callable[[], Awaitable[AuthData]]):
+    def __init__(
+        self,
+        limit: int,
+        get_auth: Callable[[], AuthData],
+        pool_size: int = 2,
+        refresh_at: float = 0.8,
+        refresh_before: int = 300,
+        expiry_margin: int = 30,
+        max_failures: int = 3,
+        metrics: Optional[ScrapeMetrics] = None,
+    ):
+        # Tokens are minted by the blocking `get_auth` on a thread pool, so the
+        # event loop keeps serving requests while a new token is produced.
+        # `pool_size` tokens are kept warm and a replacement is started once a
+        # token passes `refresh_at` of its usage limit or gets within
+        # `refresh_before` seconds of its JWT expiry.
         self._limit = limit
-        self._lock = asyncio.Lock()
-        self._request_count = 0
         self._get_auth = get_auth
-        self._auth: Optional[AuthData] = None
-        self._init_lock = asyncio.Lock()
+        self._pool_size = pool_size
+        self._refresh_uses = max(1, int(limit * refresh_at))
+        self._refresh_before = refresh_before
+        self._expiry_margin = expiry_margin
+        self._max_failures = max_failures
+        self._metrics = metrics or ScrapeMetrics()
+        self._lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="auth-mint"
+        )
+        self._tokens: List[PooledAuth] = []
+        self._minting: Set[asyncio.Task] = set()
+        self._failures = 0
+        self._last_error: Optional[BaseException] = None
+
+    def _valid(self, token: PooledAuth, now: float) -> bool:
+        expires_at = token["expires_at"]
+        return expires_at is None or expires_at - now > self._expiry_margin
+
+    def _fresh(self, token: PooledAuth, now: float) -> bool:
+        return token["uses"] < self._limit and self._valid(token, now)
+
+    def _healthy(self, token: PooledAuth, now: float) -> bool:
+        expires_at = token["expires_at"]
+        return token["uses"] < self._refresh_uses and (
+            expires_at is None or expires_at - now > self._refresh_before
+        )
+
+    async def _mint(self):
+        log = get_dagster_logger()
+        loop = asyncio.get_running_loop()
+        try:
+            with self._metrics.timer("auth_mint"):
+                auth = await loop.run_in_executor(self._executor, self._get_auth)
+        except Exception as e:
+            self._metrics.count("auth_mints", outcome="error")
+            log.error(f"Auth mint failed: {e}, Type: {type(e).__name__}")
+            async with self._lock:
+                self._failures += 1
+                self._last_error = e
+            return
+
+        self._metrics.count("auth_mints", outcome="ok")
+        async with self._lock:
+            self._failures = 0
+            self._tokens.append(
+                {"auth": auth, "uses": 0, "expires_at": jwt_expiry(auth["jwt"])}
+            )
+
+    def _top_up(self, now: float):
+        # Caller holds the lock
+        if self._failures >= self._max_failures:
+            return
+        healthy = sum(1 for t in self._tokens if self._healthy(t, now))
+        for _ in range(self._pool_size - healthy - len(self._minting)):
+            task = asyncio.create_task(self._mint())
+            self._minting.add(task)
+            task.add_done_callback(self._minting.discard)
+
+    def _pick(self, now: float) -> Optional[PooledAuth]:
+        # Caller holds the lock
+        fresh = [t for t in self._tokens if self._fresh(t, now)]
+        if fresh:
+            self._tokens = fresh
+            # Drain the most used token first so the others stay warm
+            return max(fresh, key=lambda t: t["uses"])
+        if self._minting and self._tokens:
+            # Over its usage limit but not expired, good enough until the
+            # replacement lands
+            return min(self._tokens, key=lambda t: t["uses"])
+        return None
+
+    async def warm(self):
+        async with self._lock:
+            self._top_up(time.time())
 
     async def get_auth(self) -> AuthData:
+        while True:
+            async with self._lock:
+                now = time.time()
+                self._tokens = [t for t in self._tokens if self._valid(t, now)]
+                self._top_up(now)
+                token = self._pick(now)
+                if token is not None:
+                    token["uses"] += 1
+                    return token["auth"]
+                if not self._minting:
+                    raise RuntimeError(
+                        f"Could not mint auth after {self._failures} attempts"
+                    ) from self._last_error
+                minting = set(self._minting)
+
+            # No usable token, every request queues behind the next mint
+            self._metrics.count("auth_stalls")
+            await asyncio.wait(minting, return_when=asyncio.FIRST_COMPLETED)
+
+    def close(self):
+        for task in self._minting:
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ClientPool:
+    def __init__(self, timeout: int, limits: httpx.Limits, http2: bool = False):
+        self._timeout = timeout
+        self._limits = limits
+        self._http2 = http2
+        self._lock = asyncio.Lock()
+        self._clients: Dict[Tuple[Optional[str], str], httpx.AsyncClient] = {}
+        self._users: Dict[Tuple[Optional[str], str], int] = {}
+        self._current: Optional[Tuple[Optional[str], str]] = None
+
+    @asynccontextmanager
+    async def client(
+        self, proxy_url: Optional[str], auth: AuthData
+    ) -> AsyncIterator[httpx.AsyncClient]:
+        # One keep-alive client per (proxy session, auth token). Once either
+        # rotator hands out a new session the old client is closed as soon as
+        # its last in-flight request finishes.
+        key = (proxy_url, auth["jwt"])
         async with self._lock:
-            if self._auth is None:
-                async with self._init_lock:
-                    if self._auth is None:  # Double-checked locking
-                        self._auth = await self._get_auth()
-            elif self._request_count >= self._limit:
-                self._auth = await self._get_auth()
-                self._request_count = 0
+            if key not in self._clients:
+                headers = portal_headers(auth)
+                headers["Content-Type"] = "application/json"
+                self._clients[key] = httpx.AsyncClient(
+                    proxy=proxy_url,
+                    cookies=portal_cookies(auth),
+                    headers=headers,
+                    timeout=self._timeout,
+                    limits=self._limits,
+                    http2=self._http2,
+                )
+                self._users[key] = 0
+                self._current = key
+            self._users[key] += 1
+
+        try:
+            yield self._clients[key]
+        finally:
+            async with self._lock:
+                self._users[key] -= 1
+                retired = [
+                    k for k, n in self._users.items() if n == 0 and k != self._current
+                ]
+                for k in retired:
+                    del self._users[k]
+                    await self._clients.pop(k).aclose()
+
+    async def aclose(self):
+        async with self._lock:
+            for client in self._clients.values():
+                await client.aclose()
+            self._clients.clear()
+            self._users.clear()
+
+
+class ScrapeSample(TypedDict):
+    outcome: Literal["ok", "throttled", "timeout", "error"]
+    latency: Optional[float]
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        floor: int,
+        ceiling: int,
+        initial: Optional[int] = None,
+        latency_target: float = 3.0,
+        backoff: float = 0.5,
+    ):
+        # AIMD: each healthy response grows the limit by 1/limit (about +1 per
+        # window of requests), a throttle, timeout or slow response cuts it by
+        # `backoff`. Only requests started after the last cut can cut again, so
+        # one bad burst counts once.
+        self._floor = floor
+        self._ceiling = ceiling
+        # Starts inside [floor, ceiling] whatever `initial` is set to
+        start = initial if initial is not None else floor
+        self._limit = float(min(ceiling, max(floor, start)))
+        self._latency_target = latency_target
+        self._backoff = backoff
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+        self.min_limit = self.max_limit = self.limit
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _adjust(self, sample: ScrapeSample, started: float):
+        latency = sample["latency"]
+        congested = sample["outcome"] in ("throttled", "timeout") or (
+            latency is not None and latency > self._latency_target
+        )
+        if congested:
+            if started > self._last_decrease:
+                self._limit = max(self._floor, self._limit * self._backoff)
+                self._last_decrease = time.monotonic()
+                self.decreases += 1
+        elif sample["outcome"] == "ok":
+            self._limit = min(self._ceiling, self._limit + 1 / self._limit)
+
+        self.min_limit = min(self.min_limit, self.limit)
+        self.max_limit = max(self.max_limit, self.limit)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[ScrapeSample]:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+        started = time.monotonic()
+        sample: ScrapeSample = {"outcome": "error", "latency": None}
+        try:
+            yield sample
+        finally:
+            async with self._cond:
+                self._in_flight -= 1
+                self._adjust(sample, started)
+                self._cond.notify_all()
+
+
+class WriteStats(TypedDict):
+    rows: int
+    flushes: int
+    seconds: float
+
+
+class WriteBehindBuffer:
+    _CLOSE = object()
+
+    def __init__(
+        self,
+        flush: Callable[[List], Awaitable[None]],
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int,
+    ):
+        # The bounded queue is the backpressure: once `max_pending` items are
+        # waiting on a slow flush, put() blocks the producers.
+        self._flush = flush
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+        self.stats: WriteStats = {"rows": 0, "flushes": 0, "seconds": 0.0}
+
+    async def __aenter__(self) -> "WriteBehindBuffer":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._queue.put(self._CLOSE)
+        await self._task
+        if self._error is not None and exc is None:
+            raise self._error
+
+    async def put(self, item):
+        if self._error is not None:
+            raise self._error
+        await self._queue.put(item)
+
+    async def _next_batch(self) -> Tuple[List, bool]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._flush_interval
+        batch = []
+        while len(batch) < self._batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is self._CLOSE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self):
+        closed = False
+        while not closed:
+            batch, closed = await self._next_batch()
+            # After a failed flush keep draining so producers never block forever
+            if not batch or self._error is not None:
+                continue
+
+            start = time.perf_counter()
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                self._error = e
+                continue
+            self.stats["rows"] += len(batch)
+            self.stats["flushes"] += 1
+            self.stats["seconds"] += time.perf_counter() - start
 
-            self._request_count += 1
-            return self._auth
+
+class ScrapeResult(TypedDict):
+    id: int
+    master: Optional[dict]
+    # Raw detail payload, normalized in bulk when the batch is written
+    metadata: Optional[dict]
+    error: Optional[str]
+    transient: bool
+
+
+def _posted_in(post_dates: Optional[Tuple[date, date]]) -> list:
+    # new_tenders rows posted in [start, end), or every row without a range
+    if post_dates is None:
+        return []
+    start, end = post_dates
+    return [NewTender.postDate >= start, NewTender.postDate < end]
+
+
+async def prune_unchanged_tenders(
+    session: AsyncSession, post_dates: Optional[Tuple[date, date]] = None
+) -> int:
+    # Scoped to one partition's rows, so parallel backfills of other months
+    # never touch (and lock) each other's tenders
+    new = NewTender.__table__
+    master = MasterTender.__table__
+    metadata = TenderMetadata.__table__
+
+    # Tenders scraped before fingerprints existed take the current listing as
+    # their baseline rather than all being re-scraped at once
+    await session.execute(
+        update(master)
+        .where(
+            master.c.id == new.c.id,
+            master.c.fingerprint.is_(None),
+            *_posted_in(post_dates),
+        )
+        .values(fingerprint=new.c.fingerprint, importedAt=master.c.importedAt)
+    )
+
+    # A scraped tender stays in new_tenders only while its listing fingerprint
+    # differs from the one it was scraped with, or the portal reports a newer
+    # modifiedDate than the stored metadata
+    stmt = delete(new).where(
+        new.c.id == master.c.id,
+        new.c.fingerprint == master.c.fingerprint,
+        ~exists().where(
+            metadata.c.id == new.c.id,
+            new.c.modifiedDate > metadata.c.modifiedDate,
+        ),
+        *_posted_in(post_dates),
+    )
+    return (await session.execute(stmt)).rowcount
+
+
+async def enqueue_scrape_jobs(
+    session: AsyncSession, post_dates: Optional[Tuple[date, date]] = None
+) -> int:
+    # New tenders get a job, and changed tenders whose job already finished are
+    # sent back to pending. Jobs still queued, in flight or dead are left alone.
+    stmt = insert(ScrapeJob).from_select(
+        [ScrapeJob.id], select(NewTender.id).where(*_posted_in(post_dates))
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ScrapeJob.id],
+        set_={
+            "state": "pending",
+            "attempts": 0,
+            "lastError": None,
+            "nextAttemptAt": func.now(),
+            "claimedAt": None,
+            "updatedAt": func.now(),
+        },
+        where=ScrapeJob.state == "done",
+    )
+    return (await session.execute(stmt)).rowcount
+
+
+async def release_stale_jobs(
+    session: AsyncSession,
+    lease: timedelta,
+    post_dates: Optional[Tuple[date, date]] = None,
+) -> int:
+    # Jobs left in flight by a killed run become claimable again once their
+    # lease runs out. Live runs keep renewing theirs through a LeaseKeeper.
+    stmt = (
+        update(ScrapeJob)
+        .where(
+            ScrapeJob.state == "in_flight",
+            ScrapeJob.claimedAt < func.now() - lease,
+        )
+        .values(state="pending", updatedAt=func.now())
+    )
+    if post_dates is not None:
+        # Jobs whose listing row is gone belong to no partition, any run can
+        # release them and the next claim marks them done
+        stmt = stmt.where(
+            or_(
+                exists().where(NewTender.id == ScrapeJob.id, *_posted_in(post_dates)),
+                ~exists().where(NewTender.id == ScrapeJob.id),
+            )
+        )
+    return (await session.execute(stmt)).rowcount
+
+
+async def renew_scrape_leases(session: AsyncSession, ids: List[int]) -> int:
+    stmt = (
+        update(ScrapeJob)
+        .where(ScrapeJob.id.in_(ids), ScrapeJob.state == "in_flight")
+        .values(claimedAt=func.now())
+    )
+    return (await session.execute(stmt)).rowcount
+
+
+class LeaseKeeper:
+    def __init__(self, sessions: async_sessionmaker[AsyncSession], interval: float):
+        # Jobs stay held from the claim until their result is written, however
+        # long they wait in the cursor, the worker queue or the write buffer.
+        # Every `interval` seconds the held jobs' claimedAt is pushed forward,
+        # so only a run that died lets its leases run out.
+        self._sessions = sessions
+        self._interval = interval
+        self._held: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def hold(self, ids: Iterable[int]):
+        self._held.update(ids)
+
+    def release(self, ids: Iterable[int]):
+        self._held.difference_update(ids)
+
+    async def __aenter__(self) -> "LeaseKeeper":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            if not self._held:
+                continue
+            async with self._sessions() as session:
+                await renew_scrape_leases(session, list(self._held))
+                await session.commit()
+
+
+async def claim_scrape_jobs(
+    session: AsyncSession,
+    limit: int,
+    post_dates: Optional[Tuple[date, date]] = None,
+) -> Set[int]:
+    claimable = (
+        select(ScrapeJob.id)
+        .where(
+            ScrapeJob.state.in_(("pending", "failed")),
+            ScrapeJob.nextAttemptAt <= func.now(),
+        )
+        .order_by(ScrapeJob.nextAttemptAt, ScrapeJob.id)
+        .limit(limit)
+        .with_for_update(of=ScrapeJob, skip_locked=True)
+    )
+    if post_dates is not None:
+        # Only claim jobs whose tender was posted in [start, end)
+        claimable = claimable.join(NewTender, NewTender.id == ScrapeJob.id).where(
+            *_posted_in(post_dates)
+        )
+    claim = (
+        update(ScrapeJob)
+        .where(ScrapeJob.id.in_(claimable.scalar_subquery()))
+        .values(
+            state="in_flight",
+            attempts=ScrapeJob.attempts + 1,
+            claimedAt=func.now(),
+            updatedAt=func.now(),
+        )
+        .returning(ScrapeJob.id)
+    )
+    ids = set((await session.execute(claim)).scalars().all())
+    if not ids:
+        return ids
+
+    # Jobs whose listing row is gone were already scraped
+    missing = await session.execute(
+        update(ScrapeJob)
+        .where(
+            ScrapeJob.id.in_(list(ids)),
+            ~exists().where(NewTender.id == ScrapeJob.id),
+        )
+        .values(state="done", updatedAt=func.now())
+        .returning(ScrapeJob.id)
+    )
+    return ids - set(missing.scalars().all())
+
+
+async def stream_claimed_tenders(
+    sessions: async_sessionmaker[AsyncSession],
+    claim_size: int,
+    post_dates: Optional[Tuple[date, date]] = None,
+    yield_per: int = 50,
+    leases: Optional[LeaseKeeper] = None,
+) -> AsyncIterator[Row]:
+    # Claims `claim_size` jobs at a time and streams their listing rows through
+    # a server-side cursor, so only the rows the consumer hasn't taken yet are
+    # held in memory. Rows are plain tuples with attribute access, not ORM
+    # objects, so they outlive the session that read them.
+    new_tenders = NewTender.__table__
+    while True:
+        async with sessions() as session:
+            ids = await claim_scrape_jobs(session, claim_size, post_dates)
+            await session.commit()
+        if not ids:
+            return
+        if leases is not None:
+            leases.hold(ids)
+
+        async with sessions() as session:
+            result = await session.stream(
+                select(*new_tenders.c)
+                .where(new_tenders.c.id.in_(list(ids)))
+                .execution_options(yield_per=yield_per)
+            )
+            async for row in result:
+                yield row
+
+
+async def complete_scrape_jobs(session: AsyncSession, ids: List[int]):
+    await session.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.id.in_(ids))
+        .values(state="done", lastError=None, updatedAt=func.now())
+    )
+
+
+async def fail_scrape_jobs(
+    session: AsyncSession,
+    failures: List[ScrapeResult],
+    max_attempts: int,
+    base_delay: float,
+):
+    # Transient failures are retried with jittered exponential backoff until
+    # `max_attempts`, anything else goes straight to the dead-letter state
+    jobs = ScrapeJob.__table__
+    dead = or_(bindparam("permanent", type_=Boolean), jobs.c.attempts >= max_attempts)
+    delay = base_delay * func.power(2, jobs.c.attempts - 1) * (0.5 + func.random())
+    stmt = (
+        update(jobs)
+        .where(jobs.c.id == bindparam("job_id"))
+        .values(
+            state=case((dead, "dead"), else_="failed"),
+            lastError=bindparam("error"),
+            nextAttemptAt=func.now() + func.make_interval(0, 0, 0, 0, 0, 0, delay),
+            updatedAt=func.now(),
+        )
+    )
+    await session.execute(
+        stmt,
+        [
+            {
+                "job_id": f["id"],
+                "error": f["error"],
+                "permanent": not f["transient"],
+            }
+            for f in failures
+        ],
+    )
+
+
+async def scrape_queue_counts(session: AsyncSession) -> Dict[str, int]:
+    rows = await session.execute(
+        select(ScrapeJob.state, func.count()).group_by(ScrapeJob.state)
+    )
+    return {state: count for state, count in rows.all()}
+
+
+def _json_elements(value, name: str):
+    # Non-array values (null, objects, strings) flatten to no rows instead of
+    # failing the whole statement
+    array = case(
+        (func.jsonb_typeof(value) == "array", value), else_=func.jsonb_build_array()
+    )
+    return (
+        func.jsonb_array_elements(array)
+        .table_valued(column("value", JSONB), with_ordinality="ordinality")
+        .lateral(name)
+    )
+
+
+def _json_numeric(value):
+    # Amounts arrive as strings, sometimes with currency formatting
+    cleaned = func.regexp_replace(value, r"[$,\s]", "", "g")
+    return case(
+        (cleaned.op("~")(r"^-?(\d+(\.\d*)?|\.\d+)$"), cast(cleaned, Numeric)),
+        else_=None,
+    )
+
+
+async def refresh_award_facts(session: AsyncSession, ids: List[int]):
+    # Rebuilds the award, award item and bid rows of the given tenders from
+    # their tender_metadata JSON. Deleting an award cascades to its items.
+    metadata = TenderMetadata.__table__
+    awards = TenderAward.__table__
+    items = TenderAwardItem.__table__
+    bids = TenderBid.__table__
+
+    await session.execute(delete(awards).where(awards.c.masterTenderId.in_(ids)))
+    await session.execute(delete(bids).where(bids.c.masterTenderId.in_(ids)))
+
+    award = _json_elements(metadata.c.tenderAwardData, "award")
+    await session.execute(
+        insert(awards).from_select(
+            ["masterTenderId", "awardIndex", "vendorName", "awardAmount", "raw"],
+            select(
+                metadata.c.id,
+                award.c.ordinality,
+                award.c.value["vendorName"].astext,
+                _json_numeric(award.c.value["awardAmount"].astext),
+                award.c.value,
+            )
+            .join_from(metadata, award, true())
+            .where(metadata.c.id.in_(ids)),
+        )
+    )
+
+    award = _json_elements(metadata.c.tenderAwardData, "award")
+    item = _json_elements(award.c.value["awardItems"], "item")
+    await session.execute(
+        insert(items).from_select(
+            [
+                "masterTenderId",
+                "awardIndex",
+                "itemIndex",
+                "description",
+                "quantity",
+                "unitPrice",
+                "amount",
+                "raw",
+            ],
+            select(
+                metadata.c.id,
+                award.c.ordinality,
+                item.c.ordinality,
+                item.c.value["description"].astext,
+                _json_numeric(item.c.value["quantity"].astext),
+                _json_numeric(item.c.value["unitPrice"].astext),
+                _json_numeric(item.c.value["totalAmount"].astext),
+                item.c.value,
+            )
+            .join_from(metadata, award, true())
+            .join(item, true())
+            .where(metadata.c.id.in_(ids)),
+        )
+    )
+
+    bid = _json_elements(metadata.c.tenderBidInformationDataList, "bid")
+    await session.execute(
+        insert(bids).from_select(
+            ["masterTenderId", "bidIndex", "bidderName", "bidAmount", "raw"],
+            select(
+                metadata.c.id,
+                bid.c.ordinality,
+                bid.c.value["vendorName"].astext,
+                _json_numeric(bid.c.value["bidAmount"].astext),
+                bid.c.value,
+            )
+            .join_from(metadata, bid, true())
+            .where(metadata.c.id.in_(ids)),
+        )
+    )
+
+
+def prefix_tsquery(text: str) -> Optional[str]:
+    # "road rehab" -> "road:* & rehab:*", so partially typed words still match.
+    # Only word characters are kept, which leaves no tsquery syntax to escape.
+    terms = re.findall(r"\w+", text.lower())
+    return " & ".join(f"{term}:*" for term in terms) or None
+
+
+normalize_metadata = Normalizer(TenderMetadata.__table__)
+
+
+def tender_rows(listing: dict, data: dict) -> Optional[Tuple[dict, dict]]:
+    # Pairs the master_tenders row for one tender with the raw detail payload
+    # from the portal. The payload becomes a tender_metadata row once it goes
+    # through normalize_metadata.
+    tender_payloads = data.get("tenderDataList")
+    if not tender_payloads:
+        return None
+
+    metadata = dict(tender_payloads[0])
+    metadata["id"] = listing["id"]
+    return dict(listing), metadata
+
+
+def replay_listing(archive: RawArchive, start: date, end: date) -> Dict[int, dict]:
+    # Latest archived listing row per tender posted in [start, end)
+    listing: Dict[int, dict] = {}
+    for _, body in archive.replay("listing"):
+        for t in body.get("tenderDataList", []):
+            row = listing_row(t)
+            if row["postDate"] is not None and start <= row["postDate"] < end:
+                listing[row["id"]] = row
+    return listing
+
+
+def replay_tenders(
+    archive: RawArchive, listing: Dict[int, dict]
+) -> Iterator[Tuple[dict, dict]]:
+    # Rebuilds rows from the latest archived detail response of each listed tender
+    for key, entry in archive.latest("tender").items():
+        tender = listing.get(int(key))
+        if tender is None:
+            continue
+        rows = tender_rows(tender, json.loads(archive.get(entry["sha256"])))
+        if rows:
+            yield rows
 
 
 async def scrape_tender(
-    tender: NewTender,
+    tender: Union[NewTender, Row],
     proxy_rotator: ProxyRotator,
     auth_rotator: AuthRotator,
-    session_factory: async_sessionmaker[AsyncSession],
-    timeout: int,
-    semaphore: asyncio.Semaphore,
-):
-    base_url = (
-        "https://procurement-portal.novascotia.ca/procurementui/tenders?tenderId={}"
-    )
-    date_fields = ["createdDate", "modifiedDate"]
+    clients: ClientPool,
+    limiter: AdaptiveLimiter,
+    writer: WriteBehindBuffer,
+    archive: Optional[RawArchive] = None,
+    metrics: Optional[ScrapeMetrics] = None,
+) -> bool:
+    base_url = f"{PORTAL_URL}/procurementui/tenders?tenderId={{}}"
 
     log = get_dagster_logger()
     id = quote(tender.tenderId, safe="")
     url = base_url.format(id)
-    async with semaphore:
-        proxy_url = await proxy_rotator.get_proxy()
-        auth = await auth_rotator.get_auth()
-
-        headers = {
-            "Accept": "application/json, text/plain, */*",
-            "Authorization": f"Bearer {auth['jwt']}",
-            "Connection": "keep-alive",
-            "DNT": "1",
-            "Sec-Fetch-Dest": "empty",
-            "Sec-Fetch-Mode": "cors",
-            "Sec-Fetch-Site": "same-origin",
-            "Origin": "https://procurement-portal.novascotia.ca",
-            "Referer": "https://procurement-portal.novascotia.ca/tenders",
-            "User-Agent": auth["user_agent"],
-            "Content-Type": "application/json",
-        }
-
-        cookies = httpx.Cookies()
-        for cookie in auth["cookies"]:
-            cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"])
-
-        async with httpx.AsyncClient(
-            proxy=proxy_url, cookies=cookies, headers=headers, timeout=timeout
-        ) as client:
+    result: ScrapeResult = {
+        "id": tender.id,
+        "master": None,
+        "metadata": None,
+        "error": None,
+        "transient": True,
+    }
+
+    metrics = metrics or ScrapeMetrics()
+    queued = time.perf_counter()
+    async with limiter.slot() as sample:
+        metrics.observe("slot_wait", time.perf_counter() - queued)
+        with metrics.timer("proxy"):
+            proxy_url = await proxy_rotator.get_proxy()
+        with metrics.timer("auth_wait"):
+            auth = await auth_rotator.get_auth()
+
+        async with clients.client(proxy_url, auth) as client:
             try:
+                start = time.perf_counter()
                 response = await client.post(url, json={})
+                sample["latency"] = time.perf_counter() - start
+                metrics.observe("http", sample["latency"])
+                metrics.count("responses", status=str(response.status_code))
                 response.raise_for_status()
                 data = response.json()
+                sample["outcome"] = "ok"
+                if archive is not None:
+                    await asyncio.to_thread(
+                        archive.put, "tender", str(tender.id), response.content
+                    )
                 log.info(f"Received code: {response.status_code} for url: {url}")
-                await asyncio.sleep(random.uniform(0.5, 2))
 
             except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status in (403, 429):
+                    sample["outcome"] = "throttled"
+                # Other client errors won't go away by retrying
+                result["transient"] = status in (403, 429) or status >= 500
+                result["error"] = f"HTTP {status}"
                 log.error(
                     f"HTTPStatusError: Request failed: {e}, Type: {type(e).__name__} for url: {url}"
                 )
-                return
+            except httpx.TimeoutException as e:
+                sample["outcome"] = "timeout"
+                result["error"] = f"Timeout: {e}"
+                log.error(f"Request timed out: {e} for url: {url}")
             except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
                 log.error(
                     f"Request failed: {e}, Type: {type(e).__name__} for url: {url}"
                 )
-                return
-
-        master = MasterTender(
-            id=tender.id,
-            tenderId=tender.tenderId,
-            title=tender.title,
-            solicitationType=tender.solicitationType,
-            procurementEntity=tender.procurementEntity,
-            endUserEntity=tender.endUserEntity,
-            closingDate=tender.closingDate,
-            postDate=tender.postDate,
-            tenderStatus=tender.tenderStatus,
-        )
-
-        tender_payloads = data.get("tenderDataList")
-        if not tender_payloads:
-            log.warning(f"No tenderDataList found for tender {tender.tenderId}")
-            return
 
-        tender_data = tender_payloads[0]
+        if result["error"] is None:
+            listing = {
+                c: getattr(tender, c) for c in NewTender.__table__.columns.keys()
+            }
+            rows = tender_rows(listing, data)
+            if rows:
+                result["master"], result["metadata"] = rows
+            else:
+                result["error"] = "No tenderDataList"
+                log.warning(f"No tenderDataList found for tender {tender.tenderId}")
 
-        tender_data = coerce_dates(tender_data, date_fields)
+        metrics.count("requests", outcome=sample["outcome"])
+        metrics.count("scrapes", result="failed" if result["error"] else "ok")
 
-        metadata = TenderMetadata(
-            **{
-                k: v
-                for k, v in tender_data.items()
-                if k in TenderMetadata.__table__.columns.keys()
-            }
-        )
-        master.tenderMetadata = metadata
+        # Successes and failures both go through the writer so the queue state
+        # is updated in the same batch. Writing while still holding the slot
+        # lets a slow database throttle the scrapers
+        with metrics.timer("writer_wait"):
+            await writer.put(result)
 
-        async with session_factory() as session:
-            session.add(master)
-            await session.commit()
+    return result["error"] is None
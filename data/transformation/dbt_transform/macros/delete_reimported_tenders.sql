@@ -0,0 +1,19 @@
+{#
+  pre_hook for the per-tender child models (awards, bids, items). delete+insert
+  only deletes keys present in the new rows, so a tender re-scraped with no
+  awards left would keep its old ones. This clears every tender re-imported
+  since the last build first, whether or not it still has rows.
+
+  `tenders` is the relation stamping the import, with its `key` and
+  `imported_at` column names.
+#}
+{% macro delete_reimported_tenders(tenders, key='tender_id', imported_at='imported_at') %}
+  {% if is_incremental() %}
+  DELETE FROM {{ this }}
+  WHERE tender_id IN (
+    SELECT {{ adapter.quote(key) }}
+    FROM {{ tenders }}
+    WHERE {{ imported_since_last_build(adapter.quote(imported_at)) }}
+  )
+  {% endif %}
+{% endmacro %}
@@ -0,0 +1,14 @@
+{#
+  Incremental filter on `column` against the newest `watermark` already in
+  {{ this }}, minus the `incremental_lookback` var.
+
+  importedAt is stamped when the writing transaction starts, so a row can
+  commit after a build that already saw newer ones. The lookback re-reads that
+  window on every build; merge and delete+insert make the overlap harmless.
+#}
+{% macro imported_since_last_build(column, watermark='imported_at') %}
+  {{ column }} > (
+    SELECT coalesce(max({{ watermark }}), '-infinity') - interval '{{ var("incremental_lookback") }}'
+    FROM {{ this }}
+  )
+{% endmacro %}
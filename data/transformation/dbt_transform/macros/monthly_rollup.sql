@@ -0,0 +1,50 @@
+{#
+  Spend and counts from fct_tenders per posting month and `dimensions`.
+
+  On incremental runs only the months holding tenders imported since the last
+  build are recomputed, along with the months those tenders were counted under
+  before a re-scrape moved them. Models using this are delete+insert on
+  post_month and run `delete_affected_months` as a pre_hook, so each affected
+  month is replaced whole (or dropped once empty) and every other month is
+  left alone.
+#}
+{% macro affected_months() %}
+  SELECT post_month
+  FROM {{ ref('fct_tenders') }}
+  WHERE post_month IS NOT NULL
+  {% if is_incremental() %}
+    AND {{ imported_since_last_build('imported_at', 'source_imported_at') }}
+  UNION
+  SELECT previous_post_month
+  FROM {{ ref('fct_tenders') }}
+  WHERE previous_post_month IS NOT NULL
+    AND {{ imported_since_last_build('imported_at', 'source_imported_at') }}
+  {% endif %}
+{% endmacro %}
+
+{% macro delete_affected_months() %}
+  {% if is_incremental() %}
+  DELETE FROM {{ this }} WHERE post_month IN ({{ affected_months() }})
+  {% endif %}
+{% endmacro %}
+
+{% macro monthly_rollup(dimensions=[]) %}
+
+WITH affected_months AS (
+  {{ affected_months() }}
+)
+
+SELECT
+  post_month,
+  {% for dimension in dimensions %}
+  {{ dimension }},
+  {% endfor %}
+  count(*) AS tender_count,
+  sum(award_count) AS award_count,
+  coalesce(sum(award_total), 0) AS award_total,
+  max(imported_at) AS source_imported_at
+FROM {{ ref('fct_tenders') }}
+WHERE post_month IN (SELECT post_month FROM affected_months)
+GROUP BY post_month{% for dimension in dimensions %}, {{ dimension }}{% endfor %}
+
+{% endmacro %}
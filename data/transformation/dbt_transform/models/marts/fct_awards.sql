@@ -0,0 +1,30 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key='tender_id',
+    incremental_strategy='delete+insert',
+    pre_hook="{{ delete_reimported_tenders(ref('stg_tenders')) }}",
+    indexes=[
+      {'columns': ['tender_id', 'award_index'], 'unique': True},
+      {'columns': ['vendor_name']},
+      {'columns': ['post_month']},
+      {'columns': ['imported_at']},
+    ]
+  )
+}}
+
+SELECT
+  a.tender_id,
+  a.award_index,
+  a.vendor_name,
+  a.award_amount,
+  t.procurement_entity,
+  t.solicitation_type,
+  t.post_date,
+  date_trunc('month', t.post_date)::date AS post_month,
+  a.imported_at
+FROM {{ ref('stg_tender_awards') }} a
+JOIN {{ ref('stg_tenders') }} t ON t.tender_id = a.tender_id
+{% if is_incremental() %}
+WHERE {{ imported_since_last_build('a.imported_at') }}
+{% endif %}
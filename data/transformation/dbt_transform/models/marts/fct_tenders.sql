@@ -0,0 +1,79 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key='tender_id',
+    incremental_strategy='merge',
+    on_schema_change='append_new_columns',
+    indexes=[
+      {'columns': ['tender_id'], 'unique': True},
+      {'columns': ['post_month']},
+      {'columns': ['procurement_entity']},
+      {'columns': ['imported_at']},
+    ]
+  )
+}}
+
+WITH tenders AS (
+  SELECT *
+  FROM {{ ref('stg_tenders') }}
+  {% if is_incremental() %}
+  WHERE {{ imported_since_last_build('imported_at') }}
+  {% endif %}
+),
+
+awards AS (
+  SELECT
+    tender_id,
+    count(*) AS award_count,
+    sum(award_amount) AS award_total
+  FROM {{ ref('stg_tender_awards') }}
+  WHERE tender_id IN (SELECT tender_id FROM tenders)
+  GROUP BY tender_id
+),
+
+bids AS (
+  SELECT
+    tender_id,
+    count(*) AS bid_count
+  FROM {{ ref('stg_tender_bids') }}
+  WHERE tender_id IN (SELECT tender_id FROM tenders)
+  GROUP BY tender_id
+)
+
+SELECT
+  t.tender_id,
+  t.tender_number,
+  t.title,
+  t.solicitation_type,
+  t.procurement_entity,
+  t.end_user_entity,
+  t.tender_status,
+  t.procurement_method,
+  t.unspsc_code,
+  t.unspsc_description,
+  t.post_date,
+  date_trunc('month', t.post_date)::date AS post_month,
+  {% if is_incremental() %}
+  -- The month this tender was counted under before a re-scrape moved it, so
+  -- the rollups can recompute it. Kept until the month changes again.
+  CASE
+    WHEN prev.post_month IS DISTINCT FROM date_trunc('month', t.post_date)::date
+      THEN prev.post_month
+    {% if 'previous_post_month' in adapter.get_columns_in_relation(this) | map(attribute='name') | list %}
+    ELSE prev.previous_post_month
+    {% endif %}
+  END AS previous_post_month,
+  {% else %}
+  NULL::date AS previous_post_month,
+  {% endif %}
+  t.closing_date,
+  coalesce(a.award_count, 0) AS award_count,
+  a.award_total,
+  coalesce(b.bid_count, 0) AS bid_count,
+  t.imported_at
+FROM tenders t
+LEFT JOIN awards a ON a.tender_id = t.tender_id
+LEFT JOIN bids b ON b.tender_id = t.tender_id
+{% if is_incremental() %}
+LEFT JOIN {{ this }} prev ON prev.tender_id = t.tender_id
+{% endif %}
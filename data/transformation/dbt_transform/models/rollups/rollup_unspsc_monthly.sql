@@ -0,0 +1,13 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key='post_month',
+    incremental_strategy='delete+insert',
+    pre_hook="{{ delete_affected_months() }}",
+    indexes=[
+      {'columns': ['post_month', 'unspsc_code']},
+    ]
+  )
+}}
+
+{{ monthly_rollup(['unspsc_code', 'unspsc_description']) }}
@@ -0,0 +1,27 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key='tender_id',
+    incremental_strategy='delete+insert',
+    pre_hook="{{ delete_reimported_tenders(source('dwh', 'master_tenders'), 'id', 'importedAt') }}",
+    indexes=[
+      {'columns': ['tender_id', 'award_index', 'item_index'], 'unique': True},
+      {'columns': ['imported_at']},
+    ]
+  )
+}}
+
+SELECT
+  ti."masterTenderId" AS tender_id,
+  ti."awardIndex" AS award_index,
+  ti."itemIndex" AS item_index,
+  ti.description,
+  ti.quantity,
+  ti."unitPrice" AS unit_price,
+  ti.amount,
+  mt."importedAt" AS imported_at
+FROM {{ source('dwh', 'tender_award_items') }} ti
+JOIN {{ source('dwh', 'master_tenders') }} mt ON mt.id = ti."masterTenderId"
+{% if is_incremental() %}
+WHERE {{ imported_since_last_build('mt."importedAt"') }}
+{% endif %}
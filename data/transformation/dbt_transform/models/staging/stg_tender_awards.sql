@@ -0,0 +1,26 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key='tender_id',
+    incremental_strategy='delete+insert',
+    pre_hook="{{ delete_reimported_tenders(source('dwh', 'master_tenders'), 'id', 'importedAt') }}",
+    indexes=[
+      {'columns': ['tender_id', 'award_index'], 'unique': True},
+      {'columns': ['imported_at']},
+    ]
+  )
+}}
+
+-- Keyed on the tender alone and cleared by the pre_hook, so a re-scraped
+-- tender replaces all of its awards, even when none are left
+SELECT
+  ta."masterTenderId" AS tender_id,
+  ta."awardIndex" AS award_index,
+  ta."vendorName" AS vendor_name,
+  ta."awardAmount" AS award_amount,
+  mt."importedAt" AS imported_at
+FROM {{ source('dwh', 'tender_awards') }} ta
+JOIN {{ source('dwh', 'master_tenders') }} mt ON mt.id = ta."masterTenderId"
+{% if is_incremental() %}
+WHERE {{ imported_since_last_build('mt."importedAt"') }}
+{% endif %}
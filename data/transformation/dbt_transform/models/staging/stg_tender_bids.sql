@@ -0,0 +1,24 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key='tender_id',
+    incremental_strategy='delete+insert',
+    pre_hook="{{ delete_reimported_tenders(source('dwh', 'master_tenders'), 'id', 'importedAt') }}",
+    indexes=[
+      {'columns': ['tender_id', 'bid_index'], 'unique': True},
+      {'columns': ['imported_at']},
+    ]
+  )
+}}
+
+SELECT
+  tb."masterTenderId" AS tender_id,
+  tb."bidIndex" AS bid_index,
+  tb."bidderName" AS bidder_name,
+  tb."bidAmount" AS bid_amount,
+  mt."importedAt" AS imported_at
+FROM {{ source('dwh', 'tender_bids') }} tb
+JOIN {{ source('dwh', 'master_tenders') }} mt ON mt.id = tb."masterTenderId"
+{% if is_incremental() %}
+WHERE {{ imported_since_last_build('mt."importedAt"') }}
+{% endif %}
@@ -0,0 +1,36 @@
+{{
+  config(
+    materialized='incremental',
+    unique_key='tender_id',
+    incremental_strategy='merge',
+    indexes=[
+      {'columns': ['tender_id'], 'unique': True},
+      {'columns': ['imported_at']},
+    ]
+  )
+}}
+
+SELECT
+  mt.id AS tender_id,
+  mt."tenderId" AS tender_number,
+  mt.title,
+  mt."solicitationType" AS solicitation_type,
+  mt."procurementEntity" AS procurement_entity,
+  mt."endUserEntity" AS end_user_entity,
+  mt."tenderStatus" AS tender_status,
+  mt."postDate" AS post_date,
+  mt."closingDate" AS closing_date,
+  tm."procurementMethod" AS procurement_method,
+  tm."issuedDate" AS issued_date,
+  tm."createdDate" AS created_date,
+  tm."modifiedDate" AS modified_date,
+  tm."unspscLevelData" AS unspsc_level_data,
+  -- The first UNSPSC entry is the tender's primary category
+  tm."unspscLevelData" -> 0 ->> 'unspscCode' AS unspsc_code,
+  tm."unspscLevelData" -> 0 ->> 'unspscDescription' AS unspsc_description,
+  mt."importedAt" AS imported_at
+FROM {{ source('dwh', 'master_tenders') }} mt
+LEFT JOIN {{ source('dwh', 'tender_metadata') }} tm ON tm.id = mt.id
+{% if is_incremental() %}
+WHERE {{ imported_since_last_build('mt."importedAt"') }}
+{% endif %}
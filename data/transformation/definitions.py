@@ -2,22 +2,39 @@ from pathlib import Path
 
 import dagster as dg
 
-from dagster_dbt import DbtCliResource, dbt_assets
+from dagster_dbt import DagsterDbtTranslator, DbtCliResource, dbt_assets
 from project import transformation_project
 
 
-@dbt_assets(manifest=Path("packaged_dbt_project", "target", "manifest.json"))
-def transformation_dbt_assets(context: dg.AssetExecutionContext, dbt: DbtCliResource):
-    yield from dbt.cli(["build", "--no-partial-parse"], context=context).stream()
+class TransformationTranslator(DagsterDbtTranslator):
+    # Models rebuild as soon as ingestion lands new data. They are incremental,
+    # so each run only touches what changed.
+    def get_automation_condition(self, dbt_resource_props):
+        return dg.AutomationCondition.eager()
 
 
-@dg.asset(deps=["new_tenders"])
-def example_asset(context: dg.AssetExecutionContext):
-    context.log.info("test")
+class DbtBuildConfig(dg.Config):
+    # Rebuild incremental models from scratch instead of merging new rows
+    full_refresh: bool = False
+
+
+@dbt_assets(
+    manifest=Path("packaged_dbt_project", "target", "manifest.json"),
+    dagster_dbt_translator=TransformationTranslator(),
+)
+def transformation_dbt_assets(
+    context: dg.AssetExecutionContext, dbt: DbtCliResource, config: DbtBuildConfig
+):
+    # Incremental models only read rows whose importedAt is newer than what
+    # they already hold, so a routine build scales with the new data
+    args = ["build", "--no-partial-parse"]
+    if config.full_refresh:
+        args.append("--full-refresh")
+    yield from dbt.cli(args, context=context).stream()
 
 
 defs = dg.Definitions(
-    assets=[example_asset, transformation_dbt_assets],
+    assets=[transformation_dbt_assets],
     resources={
         "dbt": DbtCliResource(project_dir=transformation_project),
     },